@@ -1,30 +1,44 @@
 
-from board_pieces import Hex, Node, Edge
+from board import Board
+from board_io import open_boards
 from game import Player, Game
 import constants
 import random
 
 class Tracker:
-    def __init__(self):
+    def __init__(self, board_file=None, board_index=0):
+        self.hex_specs = []
+        self.port_specs = None
         self.hexes = []
         self.nodes = {}
         self.players = [Player(i) for i in range(4)]
         self.setup_phase = False
         
         #self.input_hexes()
-        self.make_test_hex()
+        if board_file:
+            self.load_board(board_file, board_index)
+        else:
+            self.make_test_hex()
+        self.build_board()
         self.show_hexes()
-        self.create_nodes_from_hex_map()
-        self.assign_nodes_to_hexes()
-        self.assign_ports_to_nodes()
         self.input_settlements()
         self.print_player_resources()
         self.distribute_resources_by_roll()
     
     def make_test_hex(self):
-        test_list = constants.TEST_BOARD.copy()
-        for num, resource in test_list:
-            self.hexes.append(Hex(resource, num))
+        self.hex_specs = constants.TEST_BOARD.copy()
+
+    def load_board(self, path, index=0):
+        #board record from a board_io file (hexes and ports)
+        board = open_boards(path)[index]
+        self.hex_specs = [(hex.dice_number or 0, hex.resource) for hex in board.hexes]
+        self.port_specs = board.port_layout()
+
+    def build_board(self):
+        #nodes, adjacency and ports come from the shared board topology
+        self.board = Board(test_hexes = self.hex_specs, ports = self.port_specs)
+        self.hexes = self.board.hexes
+        self.nodes = self.board.nodes
         
     def input_hexes(self):
         print('enter 19 hexes: resource, dice number ')
@@ -37,25 +51,11 @@ class Tracker:
                     if num not in range(0,13) or res not in constants.RESOURCES + ['desert']:
                         print('error')
                         continue
-                    self.hexes.append(Hex(res, num))
+                    self.hex_specs.append((num, res))
                     break
                 except:
                     print('invalid')
 
-    def create_nodes_from_hex_map(self):
-        node_ids = set()
-        for node_list in constants.HEX_TO_NODE_MAP.values():
-            node_ids.update(node_list)
-        self.nodes = {node_id: Node(node_id) for node_id in node_ids}
-   
-    def assign_nodes_to_hexes(self):
-        for i, hex in enumerate(self.hexes):
-            node_ids = constants.HEX_TO_NODE_MAP[i]
-            hex.node_ids = node_ids
-
-            for node_id in node_ids:
-                self.nodes[node_id].adj_hexes.append(i)
-    
     def input_settlements(self):
         print('enter starting settlements, node_x player')
         print('done to finish')
@@ -72,8 +72,7 @@ class Tracker:
                     print(f'{node_id} not a valid node')
                     continue
                 
-                self.nodes[node_id].owner = p_id
-                self.nodes[node_id].building_type = 'settlement'
+                self.board.place_settlement(node_id, p_id)
                 self.players[p_id].settlements.add(node_id)
 
                 settle_counts[p_id] += 1
@@ -83,17 +82,6 @@ class Tracker:
             except:
                 print('invalid')
             
-    def assign_ports_to_nodes(self):
-        port_list = constants.PORT_TYPES.copy()
-        random.shuffle(port_list)
-
-        for i in range(0,len(constants.PORT_LOCATION), 2):
-            port_type = port_list[i // 2]
-            node_a = constants.PORT_LOCATION[i]
-            node_b = constants.PORT_LOCATION[i+1]
-            self.nodes[node_a].port = port_type
-            self.nodes[node_b].port = port_type
-
     def grant_starting_resources(self, player_id, node_id):
         for hex_tile in self.hexes:
             if node_id in hex_tile.node_ids and hex_tile.resource != 'desert':
@@ -101,8 +89,9 @@ class Tracker:
                 print(f"Player {player_id} receives 1 {hex_tile.resource} from hex {hex_tile.dice_number}")
 
     def spend_resources(self, player, cost_dict):
+        #hands can't go negative (hand.py), a build we didn't see the cards for just empties the count
         for res, amt in cost_dict.items():
-            player.resources[res] -= amt
+            player.resources[res] = max(0, player.resources[res] - amt)
 
     def distribute_resources_by_roll(self):
         while True:
@@ -359,4 +348,5 @@ class Tracker:
         return True, f'robber moved and stole 1 {stolen} from Player {target_id}'
         '''
 
-game1 = Tracker()
\ No newline at end of file
+if __name__ == '__main__':
+    game1 = Tracker()
\ No newline at end of file
@@ -0,0 +1,54 @@
+from constants import RESOURCES
+
+'''
+Integer encoding for the moves Game.legal_actions hands out: kind in the low 4 bits, then two
+7 bit arguments (node / edge / hex / resource index, or player id + 1 with 0 = nobody).
+
+  SETTLEMENT      a = node index
+  CITY            a = node index
+  ROAD            a = edge index
+  BUY_DEV         -
+  KNIGHT          a = hex index, b = target player id + 1 (0 = no one to steal from)
+  MONOPOLY        a = resource index (constants.RESOURCES order)
+  YEAR_OF_PLENTY  a, b = resource indexes, a <= b
+  ROAD_BUILDING   a = first edge, b = second edge + 1 (0 = only one road fits), in build order:
+                  a is buildable now, b once a is built (a pair that works both ways: lower edge first)
+  BANK_TRADE      a = resource given, b = resource received (rate from Game.trade_rate)
+
+Indexes are the topology's ints, so actions fit in a python int / numpy int32 and compare cheaply.
+'''
+
+SETTLEMENT, CITY, ROAD, BUY_DEV, KNIGHT, MONOPOLY, YEAR_OF_PLENTY, ROAD_BUILDING, BANK_TRADE = range(9)
+KIND_NAMES = ('settlement', 'city', 'road', 'buy_dev', 'knight', 'monopoly', 'year_of_plenty', 'road_building', 'bank_trade')
+
+ARG_BITS = 7
+ARG_MASK = (1 << ARG_BITS) - 1
+
+
+def encode(kind, a=0, b=0):
+    return kind | a << 4 | b << (4 + ARG_BITS)
+
+
+def decode(action):
+    '''(kind, a, b)'''
+    return action & 15, action >> 4 & ARG_MASK, action >> (4 + ARG_BITS) & ARG_MASK
+
+
+def describe(action, topology):
+    '''Readable form for printing, e.g. ('road', 'node_3', 'node_4') or ('bank_trade', 'ore', 'wheat').'''
+    kind, a, b = decode(action)
+    names = topology.node_names
+    if kind in (SETTLEMENT, CITY):
+        return KIND_NAMES[kind], names[a]
+    if kind == ROAD:
+        return KIND_NAMES[kind], *(names[i] for i in topology.edge_ends[a])
+    if kind == KNIGHT:
+        return KIND_NAMES[kind], a, b - 1 if b else None
+    if kind == MONOPOLY:
+        return KIND_NAMES[kind], RESOURCES[a]
+    if kind in (YEAR_OF_PLENTY, BANK_TRADE):
+        return KIND_NAMES[kind], RESOURCES[a], RESOURCES[b]
+    if kind == ROAD_BUILDING:
+        roads = [a] + ([b - 1] if b else [])
+        return KIND_NAMES[kind], *(tuple(names[i] for i in topology.edge_ends[e]) for e in roads)
+    return (KIND_NAMES[kind],)
@@ -0,0 +1,243 @@
+from functools import lru_cache
+import random
+import numpy as np
+import constants
+from board_analysis import CORNER_NODE_SETS
+from board_batch import BoardBatch, DESERT_ID
+from node_scoring import MAX_NODE_HEXES, node_terms, weigh_terms
+from pair_scoring import POPCOUNT, PairFeatures, empty_road_counts, mask_matrix, pair_order, pair_totals
+from strategies import STRATEGIES
+from topology import TOPOLOGY
+
+'''
+Placement picks for a whole corpus of boards at once.
+
+choose_placements_batch works on BoardBatch arrays directly: node and pair features for a
+chunk of boards are built with array ops (no Board objects), scored with the same weighting
+code as the single board path (node_scoring / pair_scoring), and only the opponent-pick
+simulation that walks the ranked pairs stays a per board loop, since it draws from `random`
+in exactly the order Bot.choose_first_placement does.
+Settlements already on a board (earlier seats' picks in a draft) go in through settled_sets:
+they feed the two occupancy terms (settle spot left, road reachable spots) and the opponent
+candidates, the same things the scalar path reads off the board's masks.
+'''
+
+NUM_RESOURCES = len(constants.RESOURCES)
+ORE, WHEAT = constants.RESOURCES.index('ore'), constants.RESOURCES.index('wheat')
+SYNERGY_BITS = [sum(1 << constants.RESOURCES.index(res) for res in pair) for pair in constants.SYNERGY_RESOURCES]
+PIP_TABLE = np.array([constants.PIP_WEIGHTS.get(d, 0) for d in range(13)], dtype=np.int64)
+TILE_COUNTS = np.array([constants.TILE_DISTRIBUTION[res] for res in constants.RESOURCES])
+OPPONENT_MARGIN = 2 #simulate_opponent_picks' m
+
+
+class LayoutTables:
+    '''Everything that only depends on the topology, shared by every board.'''
+    def __init__(self, topology):
+        n, num_hexes = topology.num_nodes, topology.num_hexes
+        self.slots = np.full((n, MAX_NODE_HEXES), num_hexes, dtype=np.int64)
+        for i, hexes in enumerate(topology.node_hexes):
+            self.slots[i, :len(hexes)] = hexes
+
+        corner = [frozenset(names) in CORNER_NODE_SETS for names in topology.hex_node_names] + [False]
+        self.hex_corner = np.array(corner)
+
+        #port slots whose nodes sit on one of the node's hexes (check_port looks that far)
+        self.near_ports = np.zeros((n, len(topology.port_slots)), dtype=bool)
+        for i, hexes in enumerate(topology.node_hexes):
+            around = {j for h in hexes for j in topology.hex_nodes[h]}
+            for s, (a, b) in enumerate(topology.port_slots):
+                self.near_ports[i, s] = a in around or b in around
+
+        #pairs are symmetric, so features are built for i < j only and mirrored
+        self.tri_i, self.tri_j = np.triu_indices(n, k=1)
+        #(pair position, hex) for pairs sharing hexes, split so no pair repeats within a list
+        shared = [[], []]
+        for p, (a, b) in enumerate(zip(self.tri_i, self.tri_j)):
+            common = sorted(set(topology.node_hexes[a]) & set(topology.node_hexes[b]))
+            for k, h in enumerate(common):
+                shared[k].append((p, h))
+        self.shared = [tuple(np.array(col, dtype=np.int64) for col in zip(*pairs)) for pairs in shared if pairs]
+
+        self.road_counts = empty_road_counts(topology)[self.tri_i, self.tri_j]
+        #[pair, x] = x within 4 steps of either node (road_spot_counts before blocking)
+        reach = mask_matrix(topology, 4)
+        self.pair_reach = (reach[self.tri_i] | reach[self.tri_j]).astype(np.int64)
+
+        self.closed = mask_matrix(topology, 1)
+        self.name_rank = np.argsort(np.argsort(np.array(topology.node_names)))
+        self.pair_a, self.pair_b = pair_order(topology)
+        #[a, b] = position of the pair in the i < j list, either way round (diagonal unused)
+        self.pair_pos = np.zeros((n, n), dtype=np.int64)
+        self.pair_pos[self.tri_i, self.tri_j] = self.pair_pos[self.tri_j, self.tri_i] = np.arange(len(self.tri_i))
+        self.order_pos = self.pair_pos[self.pair_a, self.pair_b]
+
+
+@lru_cache(maxsize=None)
+def layout_tables(topology):
+    return LayoutTables(topology)
+
+
+def occupancy_terms(blocked, tables):
+    '''
+    (settle_spot, road_counts) per board and pair for blocked (B, nodes) bools (settled nodes and
+    their neighbours): settle_spot_matrix and road_spot_counts, for every pair at once.
+    '''
+    if not blocked.any():
+        return True, tables.road_counts
+    settleable = ~blocked
+    #settle spot: some open node x is neither pair node nor next to one
+    free = (~tables.closed[None] & settleable[:, None, :]).astype(np.int64)
+    settle_spot = (free @ free.transpose(0, 2, 1))[:, tables.tri_i, tables.tri_j] > 0
+    #road spots: settleable nodes in reach of either pair node, not counting the two nodes
+    i, j = tables.tri_i, tables.tri_j
+    road_counts = (settleable.astype(np.int64) @ tables.pair_reach.T) - settleable[:, i] - settleable[:, j]
+    return settle_spot, road_counts
+
+
+def batch_scores(batch, weights, tables, blocked=None):
+    '''
+    (node_scores (B, nodes), pair totals (B, pairs), pair strategy (B, pairs)) for a BoardBatch, pairs indexed by tables.pair_pos.
+    blocked: optional (B, nodes) bools, nodes built on or next to a building (None = empty boards).
+    '''
+    size = len(batch)
+    tiles = np.concatenate([batch.tiles.astype(np.int64), np.full((size, 1), DESERT_ID)], axis=1)
+    dice = np.concatenate([batch.dice.astype(np.int64), np.zeros((size, 1), dtype=np.int64)], axis=1)
+    pips = PIP_TABLE[dice]
+    land = tiles != DESERT_ID
+    resource = np.where(land, tiles, -1)
+    boards = np.arange(size)[:, None, None]
+
+    #per board scarcity, same thresholds as BoardAnalysis.resource_scarcity
+    onehot = (tiles[..., None] == np.arange(NUM_RESOURCES)) & land[..., None]
+    res_totals = (pips[..., None] * onehot).sum(axis=1)
+    scarce = res_totals / TILE_COUNTS < 2.6
+    hex_scarce = np.concatenate([scarce, np.zeros((size, 1), dtype=bool)], axis=1)[np.arange(size)[:, None], np.where(land, tiles, NUM_RESOURCES)]
+
+    #per node hex order of BoardAnalysis.node_hexes: by resource (desert and padding last), best pips, corner first
+    slots = tables.slots
+    rank = np.where(land, tiles, NUM_RESOURCES)[:, slots]
+    order_key = (rank * 8 + (5 - pips[:, slots])) * 2 + ~tables.hex_corner[slots]
+    slots = np.take_along_axis(np.broadcast_to(slots, order_key.shape), np.argsort(order_key, axis=-1, kind='stable'), axis=-1)
+    slot_res, slot_pips, slot_dice, slot_land = resource[boards, slots], pips[boards, slots], dice[boards, slots], land[boards, slots]
+    node_pips = slot_pips.sum(axis=-1)
+    dice_bits = np.bitwise_or.reduce(np.where(slot_land, 1 << slot_dice, 0), axis=-1)
+    res_bits = np.bitwise_or.reduce(np.where(slot_land, 1 << np.maximum(slot_res, 0), 0), axis=-1)
+    res_synergy = np.zeros(res_bits.shape, dtype=bool)
+    for bits in SYNERGY_BITS:
+        res_synergy |= (res_bits & bits) == bits
+    has_ore = ((slot_res == ORE) & (slot_dice >= 3)).any(axis=-1)
+
+    kind_bits = 1 << batch.ports.astype(np.int64)
+    node_kinds = np.bitwise_or.reduce(np.where(tables.near_ports[None], kind_bits[:, None, :], 0), axis=-1)
+    port_res_bits = (node_kinds >> 1) & ((1 << NUM_RESOURCES) - 1) #PORT_KINDS = ['3:1'] + 2:1 per resource
+    port_synergy = (slot_land & (slot_pips >= 3) & ((port_res_bits[..., None] >> np.maximum(slot_res, 0)) & 1 == 1)).any(axis=-1)
+
+    terms = node_terms(
+        node_pips, slot_res, hex_scarce[boards, slots], slot_pips, tables.hex_corner[slots],
+        POPCOUNT[node_kinds], port_synergy, POPCOUNT[dice_bits], res_synergy,
+        has_ore & ~scarce[:, WHEAT][:, None], slot_land.sum(axis=-1),
+    )
+    node_scores = weigh_terms(terms, weights)
+
+    #pair pips: both nodes' pips minus the hexes they share
+    i, j = tables.tri_i, tables.tri_j
+    hex_res_pips = pips[..., None] * onehot
+    node_res = hex_res_pips[boards, slots].sum(axis=2)
+    res_pips = node_res[:, i] + node_res[:, j]
+    for pair, h in tables.shared:
+        res_pips[:, pair] -= hex_res_pips[:, h]
+
+    f = PairFeatures(
+        res_pips,
+        (node_pips[:, i] + node_pips[:, j]) / 2,
+        POPCOUNT[dice_bits[:, i] | dice_bits[:, j]],
+        port_res_bits[:, i] | port_res_bits[:, j],
+    )
+    settle_spot, road_counts = occupancy_terms(blocked, tables) if blocked is not None else (True, tables.road_counts)
+    totals = pair_totals(f, weights, node_scores[:, i] + node_scores[:, j], settle_spot, road_counts)
+    return node_scores, totals, f.strategy
+
+
+def pick_for_board(scores, totals, strategy, ranked, by_score, taken, opponents, tables, blocked=None):
+    '''
+    Bot.search_first_placement then search_second_placement on one board, same random draws.
+    blocked: nodes the board's buildings rule out (None = empty board).
+    ranked: every pair_order position, best total first (stable), before dropping taken nodes.
+    by_score: node indexes by (-score, node id), the order simulate_opponent_picks sorts in.
+    '''
+    a, b = tables.pair_a, tables.pair_b
+    #filtering a stable ranking keeps it the stable ranking of what is left
+    ranked = ranked[~taken[a[ranked]] & ~taken[b[ranked]]]
+    if len(ranked) == 0:
+        raise ValueError('no open node pairs to place on')
+
+    #simulate_opponent_picks: sample `opponents` of the top few open nodes
+    choice = ranked[0] # Fallback: best pair
+    open_by_score = by_score if blocked is None else by_score[~blocked[by_score]]
+    for k in ranked.tolist():
+        candidates = open_by_score[~tables.closed[a[k], open_by_score]][:opponents + OPPONENT_MARGIN].tolist()
+        picks = random.sample(candidates, min(opponents, len(candidates)))
+        if b[k] not in picks:
+            choice = k
+            break
+    node1, node2 = a[choice], b[choice]
+    first = node1 if scores[node1] >= scores[node2] else node2
+
+    pos = tables.pair_pos
+    row = totals[pos[first]]
+    row[first] = -np.inf
+    row[taken | tables.closed[first]] = -np.inf
+    second = int(np.argmax(row))
+    if row[second] == -np.inf:
+        return first, None, STRATEGIES[strategy[pos[node1, node2]]]
+    return first, second, STRATEGIES[strategy[pos[first, second]]]
+
+
+def choose_placements_batch(boards, taken_sets=None, seats=0, chunk_size=128, weights=None, settled_sets=None):
+    '''
+    First and planned second settlement for every board, as (first node id, second node id, strategy).
+    boards: BoardBatch (or a list of Boards), taken_sets: per board iterable of node ids already
+    taken (None = nothing), seats: one seat for all boards or one per board,
+    settled_sets: per board iterable of node ids with a building on them (None = read them off a
+    list of Boards, nothing for a BoardBatch).
+    Same picks as Bot(seat).choose_first_placement(board, taken) followed by choose_second_placement
+    with the first settlement and its neighbours added to taken, called board by board.
+    '''
+    from bot import Bot, SCORING_WEIGHTS
+
+    if not isinstance(boards, BoardBatch):
+        if settled_sets is None:
+            settled_sets = [board.mask_to_nodes(board.occupied_mask) for board in boards]
+        boards = BoardBatch.from_boards(boards)
+    weights = SCORING_WEIGHTS if weights is None else weights
+    tables = layout_tables(TOPOLOGY)
+    names, index = TOPOLOGY.node_names, TOPOLOGY.node_index
+    size = len(boards)
+    seats = [seats] * size if isinstance(seats, int) else list(seats)
+    opponents = {seat: Bot(seat, 4).opponents_before_second_pick() for seat in set(seats)}
+
+    results = []
+    for start in range(0, size, chunk_size):
+        chunk = boards[start:start + chunk_size]
+        blocked = None
+        if settled_sets is not None:
+            blocked = np.zeros((len(chunk), TOPOLOGY.num_nodes), dtype=bool)
+            for i, settled in enumerate(settled_sets[start:start + chunk_size]):
+                for node_id in settled or ():
+                    blocked[i] |= tables.closed[index[node_id]]
+            if not blocked.any():
+                blocked = None
+        node_scores, totals, strategy = batch_scores(chunk, weights, tables, blocked)
+        ranked = np.argsort(-totals[:, tables.order_pos], axis=1, kind='stable')
+        by_score = np.lexsort((np.broadcast_to(tables.name_rank, node_scores.shape), -node_scores), axis=1)
+        for i in range(len(chunk)):
+            taken = np.zeros(TOPOLOGY.num_nodes, dtype=bool)
+            if taken_sets is not None and taken_sets[start + i]:
+                taken[[index[node_id] for node_id in taken_sets[start + i]]] = True
+            seat = seats[start + i]
+            first, second, picked = pick_for_board(
+                node_scores[i], totals[i], strategy[i], ranked[i], by_score[i], taken, opponents[seat], tables,
+                None if blocked is None else blocked[i]
+            )
+            results.append((names[first], None if second is None else names[second], picked))
+    return results
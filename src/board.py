@@ -1,62 +1,236 @@
 import random
-from constants import PORT_TYPES, PORT_LOCATION, DICE_NUMBERS, TILE_DISTRIBUTION, HEX_TO_NODE_MAP
+from constants import PORT_TYPES, DICE_NUMBERS, TILE_DISTRIBUTION
 from board_pieces import Hex, Node, Edge
+from topology import TOPOLOGY
+from board_analysis import BoardAnalysis
 
         
 class Board:
-    def __init__(self, test_hexes = None):
+    def __init__(self, test_hexes = None, ports = None):
+        self.topology = TOPOLOGY
         self.hexes = self.make_hexes(test_hexes) #list
         self.nodes = {}
         self.edges = []
 
-        self.create_nodes_from_hex_map()
-        self.assign_nodes_to_hexes()
-        self.create_edges_from_nodes()
-        self.assign_ports_to_nodes()
-
-    def create_nodes_from_hex_map(self):
-        node_ids = set()
-        for node_list in HEX_TO_NODE_MAP.values():
-            node_ids.update(node_list)
-        self.nodes = {node_id: Node(node_id) for node_id in node_ids}
-   
-    def assign_nodes_to_hexes(self):
-        for i, hex in enumerate(self.hexes):
-            node_ids = HEX_TO_NODE_MAP[i]
-            hex.node_ids = node_ids
+        self.create_nodes()
+        self.create_edges()
+        self.assign_ports_to_nodes(ports)
+        self.index_hexes()
+        self.rebuild_masks()
+
+    #pickling only sends the mutable state, the topology is rebuilt from the module on the other side
+    def __getstate__(self):
+        hexes = tuple((hex.dice_number or 0, hex.resource) for hex in self.hexes)
+        nodes = tuple((node.owner, node.building_type) for node in self.nodes.values())
+        edges = tuple(edge.owner for edge in self.edges)
+        return hexes, self.port_layout(), nodes, edges, self.robber_hex
+
+    def __setstate__(self, state):
+        hexes, ports, nodes, edges, robber_hex = state
+        self.__init__(hexes, ports)
+        for node, (owner, building_type) in zip(self.nodes.values(), nodes):
+            node.owner = owner
+            node.building_type = building_type
+        for edge, owner in zip(self.edges, edges):
+            edge.owner = owner
+        if robber_hex is not None and robber_hex != self.robber_hex:
+            self.move_robber(robber_hex)
+        self.rebuild_payouts()
+        self.rebuild_masks()
+
+    #SNAPSHOTS: owners + robber only, the layout never changes during a game
+
+    def snapshot(self):
+        nodes = tuple((node.owner, node.building_type) for node in self.nodes.values())
+        edges = tuple(edge.owner for edge in self.edges)
+        return nodes, edges, self.robber_hex
 
-            for node_id in node_ids:
-                self.nodes[node_id].adj_hexes.append(i)
+    def restore(self, snapshot):
+        nodes, edges, robber_hex = snapshot
+        changed = False
+        for node, (owner, building_type) in zip(self.nodes.values(), nodes):
+            if node.owner != owner or node.building_type != building_type:
+                node.owner = owner
+                node.building_type = building_type
+                self.update_node_payouts(node)
+                changed = True
+        for edge, owner in zip(self.edges, edges):
+            if edge.owner != owner:
+                edge.owner = owner
+                changed = True
+        if changed:
+            self.rebuild_masks()
+        if robber_hex is not None and robber_hex != self.robber_hex:
+            self.move_robber(robber_hex)
+
+    def port_layout(self):
+        names = self.topology.node_names
+        return tuple(self.nodes[names[a]].port for a, _ in self.topology.port_slots)
+
+    def create_nodes(self):
+        #static adjacency comes straight from the shared topology, only owners/ports are per board
+        topo = self.topology
+        for i, hex in enumerate(self.hexes):
+            hex.node_ids = topo.hex_node_names[i]
+        self.nodes = {
+            name: Node(name, i, topo.node_hexes[i], topo.node_neighbor_names[i])
+            for i, name in enumerate(topo.node_names)
+        }
     
-    def assign_ports_to_nodes(self):
-        port_list = PORT_TYPES.copy()
-        random.shuffle(port_list)
-
-        for i in range(0,len(PORT_LOCATION), 2):
-            port_type = port_list[i // 2]
-            node_a = PORT_LOCATION[i]
-            node_b = PORT_LOCATION[i+1]
-            self.nodes[node_a].port = port_type
-            self.nodes[node_b].port = port_type
+    def assign_ports_to_nodes(self, ports = None):
+        if ports is not None:
+            port_list = list(ports)
+        else:
+            port_list = PORT_TYPES.copy()
+            random.shuffle(port_list)
+
+        names = self.topology.node_names
+        for port_type, (node_a, node_b) in zip(port_list, self.topology.port_slots):
+            self.nodes[names[node_a]].port = port_type
+            self.nodes[names[node_b]].port = port_type
   
-    def create_edges_from_nodes(self):
-        edge_pairs = set()
-        for node_list in HEX_TO_NODE_MAP.values():
-            for i in range(6):
-                a = node_list[i]
-                b = node_list[(i+1) % 6]
-                edge = tuple(sorted((a,b)))
-                edge_pairs.add(edge)
-            
-        for a,b in edge_pairs:
-            node_a = self.nodes[a]
-            node_b = self.nodes[b]
-
-            edge = Edge(node_a, node_b)
-            self.edges.append(edge)
-
-            node_a.connected_nodes.add(b)
-            node_b.connected_nodes.add(a)
+    def create_edges(self):
+        names = self.topology.node_names
+        self.edges = [
+            Edge(self.nodes[names[a]], self.nodes[names[b]], e)
+            for e, (a, b) in enumerate(self.topology.edge_ends)
+        ]
+
+    def index_hexes(self):
+        self._analysis = None #layout changed (or first build), scoring tables get rebuilt on next use
+        self.robber_hex = None
+        self.hexes_by_number = {}
+        for i, hex in enumerate(self.hexes):
+            if hex.robber:
+                self.robber_hex = i
+            if hex.dice_number is not None:
+                self.hexes_by_number.setdefault(hex.dice_number, []).append(i)
+        self.rebuild_payouts()
+
+    @property
+    def analysis(self):
+        if self._analysis is None:
+            self._analysis = BoardAnalysis(self)
+        return self._analysis
+
+    #PAYOUT TABLE: dice number -> [(player_id, resource, amount)], kept in sync by the build/robber methods below
+
+    def rebuild_payouts(self):
+        self.hex_payouts = [self.collect_hex_payouts(i) for i in range(len(self.hexes))]
+        self.payouts = {}
+        for number in self.hexes_by_number:
+            self.refresh_payouts(number)
+
+    def collect_hex_payouts(self, hex_index):
+        hex = self.hexes[hex_index]
+        entries = []
+        if hex.dice_number is None:
+            return entries
+        for node_id in hex.node_ids:
+            node = self.nodes[node_id]
+            if node.owner is not None:
+                amount = 2 if node.building_type == 'city' else 1
+                entries.append((node.owner, hex.resource, amount))
+        return entries
+
+    def refresh_payouts(self, number):
+        entries = []
+        for hex_index in self.hexes_by_number[number]:
+            if hex_index != self.robber_hex:
+                entries += self.hex_payouts[hex_index]
+        self.payouts[number] = entries
+
+    def update_node_payouts(self, node):
+        numbers = set()
+        for hex_index in node.adj_hexes:
+            self.hex_payouts[hex_index] = self.collect_hex_payouts(hex_index)
+            if self.hexes[hex_index].dice_number is not None:
+                numbers.add(self.hexes[hex_index].dice_number)
+        for number in numbers:
+            self.refresh_payouts(number)
+
+    #OCCUPANCY BITBOARDS: bit i = node i. blocked = occupied nodes and their neighbors (distance rule)
+    #owner_masks / road_masks: player id -> that player's buildings (node bits) / roads (bit e = edge e)
+    #occupied_edges_mask: every road on the board, any owner
+
+    def rebuild_masks(self):
+        self.occupied_mask = 0
+        self.blocked_mask = 0
+        self.owner_masks = {}
+        self.road_masks = {}
+        self.occupied_edges_mask = 0
+        closed = self.topology.closed_masks
+        for node in self.nodes.values():
+            if node.owner is not None:
+                self.occupied_mask |= self.topology.node_bits[node.index]
+                self.blocked_mask |= closed[node.index]
+                self.owner_masks[node.owner] = self.owner_masks.get(node.owner, 0) | self.topology.node_bits[node.index]
+        for edge in self.edges:
+            if edge.owner is not None:
+                self.road_masks[edge.owner] = self.road_masks.get(edge.owner, 0) | (1 << edge.index)
+                self.occupied_edges_mask |= 1 << edge.index
+
+    def nodes_mask(self, node_ids, closed = False):
+        masks = self.topology.closed_masks if closed else self.topology.node_bits
+        index = self.topology.node_index
+        mask = 0
+        for node_id in node_ids:
+            mask |= masks[index[node_id]]
+        return mask
+
+    def mask_to_nodes(self, mask):
+        names = self.topology.node_names
+        return [names[i] for i in self.topology.mask_to_ids(mask)]
+
+    def can_settle(self, node_id):
+        i = self.topology.node_index.get(node_id)
+        return i is not None and not (self.blocked_mask >> i) & 1
+
+    def open_mask(self, exclude_nodes = None):
+        '''Nodes that pass the distance rule, also treating exclude_nodes as if they were built on.'''
+        blocked = self.blocked_mask
+        if exclude_nodes:
+            blocked |= self.nodes_mask(exclude_nodes, closed = True)
+        return self.topology.all_nodes_mask & ~blocked
+
+    #BOARD MUTATIONS: go through these so the indexes stay correct
+
+    def place_settlement(self, node_id, player_id):
+        node = self.nodes[node_id]
+        node.owner = player_id
+        node.building_type = 'settlement'
+        self.occupied_mask |= self.topology.node_bits[node.index]
+        self.blocked_mask |= self.topology.closed_masks[node.index]
+        self.owner_masks[player_id] = self.owner_masks.get(player_id, 0) | self.topology.node_bits[node.index]
+        self.update_node_payouts(node)
+
+    def place_city(self, node_id):
+        node = self.nodes[node_id]
+        node.building_type = 'city'
+        self.update_node_payouts(node)
+
+    def place_road(self, edge, player_id):
+        edge.owner = player_id
+        self.road_masks[player_id] = self.road_masks.get(player_id, 0) | (1 << edge.index)
+        self.occupied_edges_mask |= 1 << edge.index
+
+    def move_robber(self, hex_index):
+        old_hex = self.robber_hex
+        for hex in self.hexes:
+            hex.robber = False
+        self.hexes[hex_index].robber = True
+        self.robber_hex = hex_index
+
+        for i in (old_hex, hex_index):
+            if i is not None and self.hexes[i].dice_number is not None:
+                self.refresh_payouts(self.hexes[i].dice_number)
+
+    def edge_id(self, node1_id, node2_id):
+        return self.topology.edge_index_by_name.get((node1_id, node2_id))
+
+    def get_edge(self, node1_id, node2_id):
+        e = self.topology.edge_index_by_name.get((node1_id, node2_id))
+        return None if e is None else self.edges[e]
 
     def make_hexes(self, test_hexes = None):
         hexes = []
@@ -0,0 +1,111 @@
+import constants
+from strategies import PairProfile
+
+CORNER_NODE_SETS = [frozenset(nodes) for nodes in constants.CORNER_HEXES.values()]
+
+
+class BoardAnalysis:
+    '''
+    Everything the placement scoring reads that only depends on the hex layout and ports:
+    resource scarcity, per hex pips/corner flags and per node pips, dice, resources, ports
+    and the single node checks. Built once per board (Board.analysis) and thrown away only
+    when the layout is re-indexed, so score_node is just lookups.
+    All per node tables are keyed by node id, same as board.nodes.
+    '''
+    def __init__(self, board):
+        self.hex_resources = [hex.resource for hex in board.hexes]
+        self.hex_dice = [hex.dice_number for hex in board.hexes]
+        self.hex_pips = [constants.PIP_WEIGHTS.get(hex.dice_number, 0) for hex in board.hexes]
+        self.hex_corner = [frozenset(hex.node_ids) in CORNER_NODE_SETS for hex in board.hexes]
+        self.scarcity = self.resource_scarcity()
+
+        self.node_hexes = {}
+        self.node_pips = {}
+        self.node_dice = {}
+        self.node_resources = {}
+        self.node_ports = {}
+        self.node_land_hexes = {}
+        self.node_has_ore = {}
+        self.node_res_synergy = {}
+        self.node_port_synergy = {}
+        for node_id, node in board.nodes.items():
+            self.analyze_node(board, node_id, node)
+
+        self.pairs = {}
+        #filled in lazily by node_scoring / pair_scoring: layout arrays, then (weights fingerprint, scores)
+        self.features = None
+        self.node_scores = None
+        self.pair_features = None
+        self.pair_bounds = None
+        self.production = {} #robber hex (None = no robber) -> production.ProductionTable
+
+    def resource_scarcity(self):
+        pip_totals = dict.fromkeys(constants.RESOURCES, 0)
+        for resource, pips in zip(self.hex_resources, self.hex_pips):
+            if resource in pip_totals:
+                pip_totals[resource] += pips
+
+        scarcity = {}
+        for resource in constants.RESOURCES:
+            avg = pip_totals[resource] / constants.TILE_DISTRIBUTION[resource]
+            if avg < 2.6:
+                scarcity[resource] = 'scarce'
+            elif avg > 3.87:
+                scarcity[resource] = 'plentiful'
+            else:
+                scarcity[resource] = 'normal'
+        return scarcity
+
+    def hex_order_key(self, h):
+        resource = self.hex_resources[h]
+        rank = constants.RESOURCES.index(resource) if resource in constants.RESOURCES else len(constants.RESOURCES)
+        return rank, -self.hex_pips[h], not self.hex_corner[h]
+
+    def analyze_node(self, board, node_id, node):
+        hexes = node.adj_hexes
+        land = [h for h in hexes if self.hex_resources[h] != 'desert']
+
+        #ports of every node on the surrounding hexes, not just this node's own port
+        ports = set()
+        for h in hexes:
+            for other_id in board.hexes[h].node_ids:
+                port = board.nodes[other_id].port
+                if port:
+                    ports.add(port)
+        port_resources = {port.split('_')[1] for port in ports if '_' in port}
+
+        #scoring order: grouped by resource, best pips (then corner) first within a resource, so "the first
+        #hex of each resource" that score_node rewards doesn't depend on hex numbering (symmetric boards score alike)
+        self.node_hexes[node_id] = tuple(sorted(hexes, key=self.hex_order_key))
+        self.node_pips[node_id] = sum(self.hex_pips[h] for h in hexes)
+        self.node_dice[node_id] = frozenset(self.hex_dice[h] for h in land)
+        self.node_resources[node_id] = frozenset(self.hex_resources[h] for h in hexes)
+        self.node_ports[node_id] = frozenset(ports)
+        self.node_land_hexes[node_id] = len(land)
+        #compares the dice number, not the pips (kept from the original check)
+        self.node_has_ore[node_id] = any(self.hex_resources[h] == 'ore' and self.hex_dice[h] >= 3 for h in hexes)
+        self.node_res_synergy[node_id] = any(
+            all(res in self.node_resources[node_id] for res in pair) for pair in constants.SYNERGY_RESOURCES
+        )
+        self.node_port_synergy[node_id] = any(
+            self.hex_resources[h] in port_resources and self.hex_pips[h] >= 3 for h in hexes
+        )
+
+    def pair_profile(self, node1_id, node2_id):
+        '''PairProfile for the two spots, built once per (ordered) pair and memoised.'''
+        key = (node1_id, node2_id)
+        profile = self.pairs.get(key)
+        if profile is None:
+            pips = {}
+            for h in set(self.node_hexes[node1_id] + self.node_hexes[node2_id]):
+                if self.hex_dice[h] is None:
+                    continue
+                res = self.hex_resources[h]
+                pips[res] = pips.get(res, 0) + self.hex_pips[h]
+            profile = self.pairs[key] = PairProfile(
+                pips,
+                self.node_ports[node1_id] | self.node_ports[node2_id],
+                self.node_dice[node1_id] | self.node_dice[node2_id],
+                self.node_pips[node1_id] + self.node_pips[node2_id],
+            )
+        return profile
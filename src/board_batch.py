@@ -0,0 +1,69 @@
+import numpy as np
+import constants
+from board import Board
+
+DESERT_ID = constants.TILE_TYPES.index('desert')
+TILE_POOL = np.array(
+    [constants.TILE_TYPES.index(res) for res, count in constants.TILE_DISTRIBUTION.items() for _ in range(count)],
+    dtype=np.uint8
+)
+DICE_POOL = np.array(constants.DICE_NUMBERS, dtype=np.uint8)
+PORT_POOL = np.array([constants.PORT_KINDS.index(port) for port in constants.PORT_TYPES], dtype=np.uint8)
+
+
+class BoardBatch:
+    '''
+    N boards in array form:
+      - tiles (N, 19): tile id per hex (index into constants.TILE_TYPES)
+      - dice  (N, 19): dice number per hex, 0 on the desert
+      - ports (N, 9):  port id per port slot (index into constants.PORT_KINDS)
+    Board objects are only built when a board is indexed.
+    '''
+    def __init__(self, tiles, dice, ports):
+        self.tiles = np.asarray(tiles, dtype=np.uint8)
+        self.dice = np.asarray(dice, dtype=np.uint8)
+        self.ports = np.asarray(ports, dtype=np.uint8)
+
+    @classmethod
+    def from_boards(cls, boards):
+        tiles = [[constants.TILE_TYPES.index(hex.resource) for hex in board.hexes] for board in boards]
+        dice = [[hex.dice_number or 0 for hex in board.hexes] for board in boards]
+        ports = [[constants.PORT_KINDS.index(port) for port in board.port_layout()] for board in boards]
+        return cls(tiles, dice, ports)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return BoardBatch(self.tiles[i], self.dice[i], self.ports[i])
+        return self.board(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.board(i)
+
+    def hex_specs(self, i):
+        #same (dice, resource) format as constants.TEST_BOARD
+        return [(int(d), constants.TILE_TYPES[t]) for t, d in zip(self.tiles[i], self.dice[i])]
+
+    def port_layout(self, i):
+        return [constants.PORT_KINDS[p] for p in self.ports[i]]
+
+    def board(self, i):
+        return Board(test_hexes = self.hex_specs(i), ports = self.port_layout(i))
+
+
+def generate_boards(n, rng=None):
+    '''
+    N random boards at once, drawn the same way Board() does (shuffled tiles, shuffled
+    numbers on every non-desert hex, shuffled ports). rng can be a seed or a np.random.Generator.
+    '''
+    rng = np.random.default_rng(rng)
+    tiles = rng.permuted(np.tile(TILE_POOL, (n, 1)), axis=1)
+
+    dice = np.zeros_like(tiles)
+    dice[tiles != DESERT_ID] = rng.permuted(np.tile(DICE_POOL, (n, 1)), axis=1).ravel()
+
+    ports = rng.permuted(np.tile(PORT_POOL, (n, 1)), axis=1)
+    return BoardBatch(tiles, dice, ports)
@@ -0,0 +1,169 @@
+import numpy as np
+import constants
+from board import Board
+from board_batch import BoardBatch
+from topology import TOPOLOGY
+
+'''
+Fixed-width binary records, one 8 byte magic header per file then records back to back.
+
+board record (28 bytes):
+  hexes[19]  tile id << 4 | dice number (0 on the desert)
+  ports[9]   port id per port slot (index into constants.PORT_KINDS)
+
+setup record (48 bytes) = board record +
+  settlements[8]  node id of each initial settlement, in pick order (snake draft)
+  roads[8]        edge id of the road placed with that settlement
+  seats[4]        player id sitting in each seat, in turn order
+'''
+
+BOARD_MAGIC = b'CTNBRD01'
+SETUP_MAGIC = b'CTNSET01'
+HEADER_SIZE = 8
+
+BOARD_DTYPE = np.dtype([('hexes', 'u1', 19), ('ports', 'u1', 9)])
+SETUP_DTYPE = np.dtype([
+    ('hexes', 'u1', 19), ('ports', 'u1', 9),
+    ('settlements', 'u1', 8), ('roads', 'u1', 8), ('seats', 'u1', 4)
+])
+
+
+def pack_hexes(tiles, dice):
+    return (np.asarray(tiles, dtype=np.uint8) << 4) | np.asarray(dice, dtype=np.uint8)
+
+
+def encode_boards(batch):
+    '''BoardBatch (or a list of Boards) -> structured array of board records.'''
+    if not isinstance(batch, BoardBatch):
+        batch = BoardBatch.from_boards(batch)
+    records = np.zeros(len(batch), dtype=BOARD_DTYPE)
+    records['hexes'] = pack_hexes(batch.tiles, batch.dice)
+    records['ports'] = batch.ports
+    return records
+
+
+def encode_setup(board, picks, seats=(0, 1, 2, 3)):
+    '''
+    picks: 8 (player_id, node_id, road_target_id) in pick order, as returned by main.run_draft.
+    '''
+    record = np.zeros((), dtype=SETUP_DTYPE)
+    board_record = encode_boards([board])[0]
+    record['hexes'] = board_record['hexes']
+    record['ports'] = board_record['ports']
+    record['settlements'] = [TOPOLOGY.node_index[node_id] for _, node_id, _ in picks]
+    record['roads'] = [board.edge_id(node_id, target_id) for _, node_id, target_id in picks]
+    record['seats'] = seats
+    return record
+
+
+def write_records(path, records, magic):
+    with open(path, 'wb') as f:
+        f.write(magic)
+        f.write(np.ascontiguousarray(records).tobytes())
+
+
+def write_boards(path, batch):
+    write_records(path, encode_boards(batch), BOARD_MAGIC)
+
+
+def write_setups(path, records):
+    write_records(path, np.asarray(records, dtype=SETUP_DTYPE), SETUP_MAGIC)
+
+
+def decode_board(record):
+    packed = record['hexes']
+    hexes = [(int(code) & 15, constants.TILE_TYPES[int(code) >> 4]) for code in packed]
+    ports = [constants.PORT_KINDS[int(p)] for p in record['ports']]
+    return Board(test_hexes = hexes, ports = ports)
+
+
+def decode_setup(record):
+    '''Returns (board, picks, seats) with picks as (player_id, node_id, road_target_id) in pick order.'''
+    board = decode_board(record)
+    seats = [int(s) for s in record['seats']]
+    order = seats + seats[::-1]
+    picks = []
+    for k, (node, edge) in enumerate(zip(record['settlements'], record['roads'])):
+        a, b = TOPOLOGY.edge_ends[int(edge)]
+        target = b if a == int(node) else a
+        picks.append((order[k], TOPOLOGY.node_names[int(node)], TOPOLOGY.node_names[target]))
+    return board, picks, seats
+
+
+class RecordFile:
+    '''
+    Memory-mapped view of a record file. Nothing is decoded until a record is indexed,
+    so a file with millions of boards opens instantly and can be shared between processes
+    (each worker just maps the same path).
+    '''
+    def __init__(self, path, dtype, magic):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if header != magic:
+            raise ValueError(f'{path} is not a {magic.decode()} file')
+        self.path = path
+        self.records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class BoardFile(RecordFile):
+    def __init__(self, path):
+        super().__init__(path, BOARD_DTYPE, BOARD_MAGIC)
+
+    def __getitem__(self, i):
+        return decode_board(self.records[i])
+
+    def batch(self, start, stop):
+        '''Decode a slice into array form (BoardBatch) without building Boards.'''
+        packed = np.asarray(self.records['hexes'][start:stop])
+        return BoardBatch(packed >> 4, packed & 15, self.records['ports'][start:stop])
+
+
+class SetupFile(RecordFile):
+    def __init__(self, path):
+        super().__init__(path, SETUP_DTYPE, SETUP_MAGIC)
+
+    def __getitem__(self, i):
+        return decode_setup(self.records[i])
+
+
+def open_boards(path):
+    return BoardFile(path)
+
+
+def open_setups(path):
+    return SetupFile(path)
+
+
+
+if __name__ == '__main__':
+    #round trip over real drafts: encode main.run_draft's picks, decode, replay, same board and hands
+    import random
+    import constants
+    from board import Board
+    from bot import Bot
+    from game import Game
+    from main import run_draft, replay_setup
+
+    def drafted(seed):
+        random.seed(seed)
+        game = Game(Board(test_hexes = constants.TEST_BOARD), 4)
+        bots = [Bot(player_id = i, total_players = 4) for i in range(4)]
+        picks = run_draft(game, bots, seed % 4)
+        return game, picks
+
+    for seed in range(200):
+        game, picks = drafted(seed)
+        board, decoded, _ = decode_setup(encode_setup(game.board, picks))
+        replayed = Game(board, 4)
+        replay_setup(replayed, decoded)
+        assert decoded == picks, seed
+        assert replayed.board.snapshot() == game.board.snapshot(), seed
+        assert [dict(p.resources) for p in replayed.players] == [dict(p.resources) for p in game.players], seed
+    print('200 drafts encode and replay exactly')
@@ -1,12 +1,15 @@
 import random
 from constants import RESOURCES, DICE_NUMBERS, TILE_DISTRIBUTION
 
+#pieces are slotted: a board holds 145 of them and static adjacency lives in the shared topology tuples
 class Hex:
+    __slots__ = ('resource', 'dice_number', 'robber', 'node_ids')
+
     def __init__(self, resource_type, dice_number=None, node_ids = None):
         self.resource = resource_type
         self.dice_number = dice_number
         self.robber = (resource_type == 'desert')
-        self.node_ids = []
+        self.node_ids = ()
 
     def __repr__(self):
         if self.robber:
@@ -17,10 +20,13 @@ class Hex:
             return f'[{self.resource}]'
         
 class Node:
-    def __init__(self, id):
+    __slots__ = ('id', 'index', 'adj_hexes', 'connected_nodes', 'owner', 'building_type', 'port')
+
+    def __init__(self, id, index=None, adj_hexes=(), connected_nodes=()):
         self.id = id
-        self.adj_hexes = []
-        self.connected_nodes = set()
+        self.index = index
+        self.adj_hexes = adj_hexes #shared topology tuples, never mutated
+        self.connected_nodes = connected_nodes
         self.owner = None
         self.building_type = None
         self.port = None
@@ -45,9 +51,12 @@ class Node:
         return f'node: {self.id}, owner: {self.owner}, building: {self.building_type}'
 
 class Edge:
-    def __init__(self, node1, node2):
+    __slots__ = ('node1', 'node2', 'index', 'owner')
+
+    def __init__(self, node1, node2, index=None):
         self.node1 = node1
         self.node2 = node2
+        self.index = index
         self.owner = None
    
     def connects(self, id):
@@ -1,12 +1,20 @@
 import constants
-from itertools import combinations
+from itertools import islice
 import random
 from collections import deque
 from board import Board
+from board_analysis import CORNER_NODE_SETS
+from draft_search import DraftSearch
+from hand import COSTS, count as hand_count, deficit as hand_deficit, total as hand_total, unit as hand_unit
+from node_scoring import score_all_nodes
+from pair_scoring import best_pairs, pair_features, row_totals
+from placement_cache import placement_key
+from production import production_table
+import strategies
+from strategies import STRATEGIES
+import numpy as np
 from collections import defaultdict
 
-random.seed(42)
-
 
 SCORING_WEIGHTS = {
     'single_pips>11': .06,
@@ -51,65 +59,128 @@ SCORING_WEIGHTS = {
 
 
 class Bot:
-    def __init__(self, player_id, total_players):
+    def __init__(self, player_id, total_players, placement_cache=None, opening_book=None, rollout_placer=None, draft_model=None):
         self.player_id = player_id
         self.total_players = total_players
         self.strategy = ''
+        self.placement_cache = placement_cache #optional PlacementCache shared between bots/games
+        self.opening_book = opening_book #optional OpeningBook, checked before the cache and the search
+        self.rollout_placer = rollout_placer #optional RolloutPlacer, picks among the top pairs by playing them out
+        self.planned_second = None #second settlement of the pair the rollouts chose
+        self.draft_model = draft_model #optional draft_search opponent model, picks the first settlement by expected draft value
 
 
     #this is going to be my 'evaluate nodes and pick' function, going to also dictate strategy for the actual game playing
     
     def choose_first_placement(self, board, taken_nodes):
-
-        placement_scores = {}
-        node_pairs = combinations(sorted(board.nodes.keys()), 2)
-
-        for node1_id, node2_id in node_pairs:
-            if not self.valid_settlement_pair(node1_id, node2_id, board):
-                continue
-            if node1_id in taken_nodes or node2_id in taken_nodes:
-                continue
-        
-
-            score1 = self.score_node(node1_id, board)
-            score2 = self.score_node(node2_id, board)
-            synergy = self.score_node_synergy(node1_id, node2_id, board)
-            total_score = score1 + score2 + synergy
-
-            placement_scores[(node1_id, node2_id)] = (total_score, score1, score2)
-
-        for (node1_id, node2_id), (total_score, score1, score2) in sorted(placement_scores.items(), key=lambda x: x[1][0], reverse=True):
-            simulated = self.simulate_opponent_picks(board, taken_nodes={node1_id})
-            if node2_id not in simulated:
-                return node1_id if score1 >= score2 else node2_id
-
-        # Fallback
-        best_pair, (total_score, score1, score2) = max(placement_scores.items(), key=lambda x: x[1][0])
-        return best_pair[0] if score1 >= score2 else best_pair[1]
+        return self.cached_placement('first', board, taken_nodes, (), self.search_first_placement)
 
     def choose_second_placement(self, board, first_node_id, taken_nodes):
-        best_node2 = None
-        best_score = float('-inf')
-
-        for node2_id in board.nodes.keys():
-            if not self.valid_settlement_pair(first_node_id, node2_id, board):
-                
-                continue
-            if node2_id in taken_nodes:
-                
-                continue
-
-            score1 = self.score_node(first_node_id, board)
-            score2 = self.score_node(node2_id, board)
-            synergy = self.score_node_synergy(first_node_id, node2_id, board)
-            total_score = score1 + score2 + synergy
-            
-            if total_score > best_score:
-                best_score = total_score
-                best_node2 = node2_id
+        node2_id = self.cached_placement(
+            'second', board, taken_nodes, (first_node_id,),
+            lambda board, taken_nodes: self.search_second_placement(board, first_node_id, taken_nodes)
+        )
+        if node2_id is not None:
+            self.strategy = self.pair_strategy(board, first_node_id, node2_id)
+        return node2_id
+
+    def cached_placement(self, kind, board, taken_nodes, extra_nodes, search):
+        cache, book = self.placement_cache, self.opening_book
+        if (cache is None and book is None) or self.rollout_placer is not None or self.draft_model is not None:
+            #cached / book answers come from the heuristic search
+            return search(board, taken_nodes)
+
+        weights = tuple(SCORING_WEIGHTS.values())
+        key, perm = placement_key(board, kind, self.player_id, taken_nodes, extra_nodes, weights)
+        if book is not None:
+            node_id = book.get(key, perm, board)
+            if node_id is not None:
+                return node_id
+
+        node_id = cache.get(key, perm, board) if cache is not None else None
+        if node_id is None:
+            node_id = search(board, taken_nodes)
+            if cache is not None:
+                cache.put(key, perm, board, node_id)
+        if book is not None and book.learn:
+            book.put(key, perm, board, node_id)
+        return node_id
+
+    def search_first_placement(self, board, taken_nodes):
+        index = board.topology.node_index
+        node_scores = self.node_score_vector(board)
+        taken = np.zeros(len(node_scores), dtype=bool)
+        taken[[index[node_id] for node_id in taken_nodes if node_id in index]] = True
+
+        #pairs of open nodes best total first (ties in combinations(sorted(ids), 2) order), scored lazily
+        names = board.topology.node_names
+        if self.rollout_placer is not None:
+            return self.rollout_first_placement(board, taken_nodes, taken, node_scores)
+        if self.draft_model is not None:
+            return self.draft_first_placement(board, taken_nodes, taken, node_scores)
+        choice = None
+        for a, b in best_pairs(board, SCORING_WEIGHTS, node_scores, taken):
+            if choice is None:
+                choice = (a, b) # Fallback: best pair
+            simulated = self.simulate_opponent_picks(board, taken_nodes={names[a]})
+            if names[b] not in simulated:
+                choice = (a, b)
+                break
+        if choice is None:
+            raise ValueError('no open node pairs to place on')
+
+        node1, node2 = choice
+        self.strategy = self.pair_strategy(board, names[node1], names[node2])
+        return names[node1] if node_scores[node1] >= node_scores[node2] else names[node2]
+
+    def rollout_first_placement(self, board, taken_nodes, taken, node_scores):
+        #the rollout placer picks among the heuristic's top pairs, the second node is kept as the plan
+        names = board.topology.node_names
+        pairs = []
+        for a, b in islice(best_pairs(board, SCORING_WEIGHTS, node_scores, taken), self.rollout_placer.candidates):
+            pairs.append((names[a], names[b]) if node_scores[a] >= node_scores[b] else (names[b], names[a]))
+        if not pairs:
+            raise ValueError('no open node pairs to place on')
+
+        first, second = pairs[self.rollout_placer.choose(board, self.player_id, taken_nodes, pairs)]
+        self.strategy = self.pair_strategy(board, first, second)
+        self.planned_second = second
+        return first
+
+    def draft_first_placement(self, board, taken_nodes, taken, node_scores, pairs=8):
+        #both nodes of the top pairs are the first picks tried, the best expected value over the draft wins
+        names = board.topology.node_names
+        firsts = []
+        for pair in islice(best_pairs(board, SCORING_WEIGHTS, node_scores, taken), pairs):
+            firsts += [node for node in pair if node not in firsts]
+        if not firsts:
+            raise ValueError('no open node pairs to place on')
+
+        search = DraftSearch(board, SCORING_WEIGHTS, node_scores, self.player_id, self.total_players, self.draft_model)
+        mask = search.taken_mask(board, taken_nodes)
+        values = search.first_pick_values(mask, firsts)
+        first = max(firsts, key=lambda node: values[node]) #earliest on ties
+        second, _ = search.best_second(first, mask | board.topology.closed_masks[first])
+        if second is not None:
+            self.strategy = self.pair_strategy(board, names[first], names[second])
+        return names[first]
+
+    def search_second_placement(self, board, first_node_id, taken_nodes):
+        if self.rollout_placer is not None and self.planned_second is not None and self.planned_second not in taken_nodes:
+            return self.planned_second
+        index = board.topology.node_index
+        first = index[first_node_id]
+        row = row_totals(board, SCORING_WEIGHTS, self.node_score_vector(board), first)
+        row[first] = -np.inf
+        row[[index[node_id] for node_id in taken_nodes if node_id in index]] = -np.inf
+        best = int(np.argmax(row))
+        if row[best] == -np.inf:
+            return None
+        return board.topology.node_names[best]
 
-        
-        return best_node2
+    def pair_strategy(self, board, node1_id, node2_id):
+        index = board.topology.node_index
+        return STRATEGIES[pair_features(board).strategy[index[node1_id], index[node2_id]]]
 
 
     def choose_road_after_settlement(self, board, node_id, player_id):
@@ -144,12 +215,7 @@ class Bot:
             return pip_total
 
         def is_valid_future_settle(target_node):
-            if board.nodes[target_node].owner is not None:
-                return False
-            for neighbor in board.nodes[target_node].connected_nodes:
-                if board.nodes[neighbor].owner is not None:
-                    return False
-            return True
+            return board.can_settle(target_node)
 
         neighbors = board.nodes[node_id].connected_nodes
         port_nodes = [n for n in get_nodes_within_distance(node_id, 2) if board.nodes[n].port is not None]
@@ -180,10 +246,11 @@ class Bot:
         # No ports: expand toward best future settle
         best_neighbor = None
         best_score = -1
+        node_scores = self.node_scores(board)
         for neighbor in neighbors:
             if not is_valid_future_settle(neighbor):
                 continue
-            score = self.score_node(neighbor, board)
+            score = node_scores[neighbor]
             if score > best_score:
                 best_score = score
                 best_neighbor = neighbor
@@ -196,12 +263,30 @@ class Bot:
 
 
 
+    def node_scores(self, board):
+        '''node id -> score_node for every node, computed in one vectorized pass and cached per board/weights.'''
+        return self.cached_node_scores(board)[2]
+
+    def node_score_vector(self, board):
+        #same scores as an array in board.topology.node_names order
+        return self.cached_node_scores(board)[1]
+
+    def cached_node_scores(self, board):
+        analysis = board.analysis
+        weights = tuple(SCORING_WEIGHTS.values())
+        cached = analysis.node_scores
+        if cached is None or cached[0] != weights:
+            scores = score_all_nodes(board, SCORING_WEIGHTS)
+            cached = analysis.node_scores = (weights, scores, dict(zip(board.topology.node_names, scores.tolist())))
+        return cached
+
     def score_node(self, node_id, board):
         node_score = 0
-        resource_scores = self.analyze_resources(board)
+        analysis = board.analysis
+        resource_scores = analysis.scarcity
         #for res in constants.RESOURCES:
             #print(f'{res} is {resource_scores[res]}')
-        pipscore = self.score_pips(node_id, board)
+        pipscore = analysis.node_pips[node_id]
         #print(f'pipscore = {pipscore}')
         
         #PIPSCORE: might have to put this as an average of the two spots, idk
@@ -216,36 +301,37 @@ class Bot:
         
         #SCARCE RESOURCES
         scarce_resources_seen = set()
-        for hex in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex]
-            corner_check = self.check_corner(hex_obj)
-            if hex_obj.resource == 'desert':
+        for hex in analysis.node_hexes[node_id]:
+            resource = analysis.hex_resources[hex]
+            corner_check = analysis.hex_corner[hex]
+            if resource == 'desert':
                 continue
-            if resource_scores[hex_obj.resource] == 'scarce' and hex_obj.resource not in scarce_resources_seen:
+            pips = analysis.hex_pips[hex]
+            if resource_scores[resource] == 'scarce' and resource not in scarce_resources_seen:
                 node_score += SCORING_WEIGHTS['scarce_res_bonus']
-                scarce_resources_seen.add(hex_obj.resource)
+                scarce_resources_seen.add(resource)
                 #print(f'scarce resource bonus: node_score + {SCORING_WEIGHTS['scarce_res_bonus']} = {node_score}')
-                if constants.PIP_WEIGHTS[hex_obj.dice_number] == 2:
+                if pips == 2:
                     node_score += SCORING_WEIGHTS['scarce_res_2pips']
                     #print(f'scarce resource w/ small produc: node_score + {SCORING_WEIGHTS['scarce_res_2pips']} = {node_score}')
                     if corner_check:
                         node_score += SCORING_WEIGHTS['scarce_res_2pips+corner']
                         #print(f'also with corner: node_score + {SCORING_WEIGHTS['scarce_res_2pips+corner']} = {node_score}')
-                if constants.PIP_WEIGHTS[hex_obj.dice_number] == 3:
+                if pips == 3:
                     node_score += SCORING_WEIGHTS['scarce_res_3pips']
                     #print(f'scarce w/ decent produc node_score + {SCORING_WEIGHTS['scarce_res_3pips']} = {node_score}')
                     if corner_check:
                         node_score += SCORING_WEIGHTS['scarce_res_3pips+corner']
                         #print(f'again with corner: node_score + {SCORING_WEIGHTS['scarce_res_3pips+corner']} = {node_score}')
-                if constants.PIP_WEIGHTS[hex_obj.dice_number] >= 4:
+                if pips >= 4:
                     node_score += SCORING_WEIGHTS['scarce_res>4pips']
                     #print(f'high production for scarce resource: node_score + {SCORING_WEIGHTS['scarce_res>4pips']} = {node_score}')
                     if corner_check:
-                        node_score += SCORING_WEIGHTS['scarce_res>4pips+corner']
+                        node_score += SCORING_WEIGHTS['scarce_res>4pips_corner']
                         #print(f'again with corner: node_score + {SCORING_WEIGHTS['scarce_res>4pips+corner']} = {node_score}')
 
         #PORTS
-        ports = self.check_port(node_id, board)
+        ports = analysis.node_ports[node_id]
         #print(f'ports: {len(ports)}')
         #print(ports)
         if len(ports) == 0:
@@ -257,27 +343,27 @@ class Bot:
         elif len(ports) == 2:
             node_score += SCORING_WEIGHTS['2_ports']
             #print(f'2 ports: node_score + {SCORING_WEIGHTS['2_ports']} = {node_score}')
-        syn_check_ports = self.check_port_synergy(node_id, board)
+        syn_check_ports = analysis.node_port_synergy[node_id]
         if syn_check_ports:
             node_score += SCORING_WEIGHTS['port_synergy']
             #print(f'syn port: node_score + {SCORING_WEIGHTS['port_synergy']} = {node_score}')
 
         #NUM DIVERSITY
-        if self.check_num_diversity(node_id, board):
+        if len(analysis.node_dice[node_id]) == 3:
             node_score += SCORING_WEIGHTS['number_diversity']
             #print(f'number diversity: node_score + {SCORING_WEIGHTS['number_diversity']} = {node_score}')
         #print(f'node_score = {node_score}')
     
         #GENERAL SYNERGY CHECK
-        if self.check_res_synergy(node_id, board):
+        if analysis.node_res_synergy[node_id]:
             node_score += SCORING_WEIGHTS['resource_synergy']
             #print(f'resource synergy: node_score + {SCORING_WEIGHTS['resource_synergy']} = {node_score}')
 
-        if self.ore_check(node_id, board) and resource_scores['wheat'] != 'scarce':
+        if analysis.node_has_ore[node_id] and resource_scores['wheat'] != 'scarce':
             node_score += SCORING_WEIGHTS['ore_check']
             #print(f'decent ore: node_score + {SCORING_WEIGHTS['ore_check']} = {node_score}')
         
-        if self.threehex_check(node_id, board) == 3:
+        if analysis.node_land_hexes[node_id] == 3:
             node_score += SCORING_WEIGHTS['3hexes']
         
         return node_score
@@ -287,6 +373,8 @@ class Bot:
 
     def score_node_synergy(self, node1_id, node2_id, board):
         '''
+        Returns (setup_score, strategy) for the pair.
+
         general: 
         - additional number diversity DONE
         - additional port synergy
@@ -296,82 +384,51 @@ class Bot:
         - Port strategy?
         - Add a production + build to the spot where you round your setup out? (Hard)
         '''
+        profile = board.analysis.pair_profile(node1_id, node2_id)
         
         #PIPSCORE
         setup_score = 0
 
-        pipscore = self.score_pips(node1_id, board, node2_id) / 2
+        pipscore = profile.pip_sum / 2
         if pipscore > 10.3:
             setup_score += SCORING_WEIGHTS['2spot_pips>10.3']
-            #print(f'pips > 11: node_score + {SCORING_WEIGHTS['2spot_pips>10.3']} = {setup_score}')
         elif pipscore <= 10.3 and pipscore >= 9:
             setup_score += SCORING_WEIGHTS['2spot_pips<=10.3>=9']
-            #print(f'pips between 11 and 9: node_score + {SCORING_WEIGHTS['2spot_pips>10.3>=9']} = {setup_score}')
         
         #NUMBER DIVERSITY
-        numbers = self.check_num_diversity(node1_id, board, node2_id)
+        numbers = len(profile.numbers)
         if numbers == 5:
             setup_score += SCORING_WEIGHTS['2spot_number_diversity=5']
-            #print(f'setup pips: + {SCORING_WEIGHTS['2spot_number_diversity=5']} = {setup_score}')
         if numbers == 6:
             setup_score += SCORING_WEIGHTS['2spot_number_diversity=6']
-            #print(f'setup pips: + {SCORING_WEIGHTS['2spot_number_diversity=6']} = {setup_score}')
 
-        
         #Port Synergy Check
-        port_synergy = self.check_port_synergy_dual(node1_id, node2_id, board)
-        if port_synergy:
+        if strategies.has_port_synergy(profile):
             setup_score += SCORING_WEIGHTS['2spot_port_synergy']
-            #print(f'setup pips: + {SCORING_WEIGHTS['2spot_port_synergy']} = {setup_score}')
         
         #STRATEGIES
-            
-        #OWS:
-        if self.is_ows_setup(node1_id, node2_id, board):
-            self.strategy = 'OWS'
-            setup_score += SCORING_WEIGHTS['OWS']
-            setup_score += self.ows_pip_balance_score(node1_id, node2_id, board)
+        strategy = strategies.classify(profile)
+        setup_score += SCORING_WEIGHTS[strategy]
+
+        if strategy == 'OWS':
+            setup_score += strategies.ows_pip_balance_score(profile, SCORING_WEIGHTS['OWS_ratio_bonus_magnifier'])
             if self.check_settle_spot(board, {node1_id, node2_id}):
                 setup_score += SCORING_WEIGHTS['2spot_settle_spot']
 
-        #OWS Hybrid
-        elif self.is_ows_hybrid_setup(node1_id, node2_id, board):
-            self.strategy = 'OWS_HYBRID'
-            setup_score += SCORING_WEIGHTS['OWS_HYBRID']
+        elif strategy in ('OWS_HYBRID', 'BALANCED'):
             if self.check_settle_spot(board, {node1_id, node2_id}):
                 setup_score += SCORING_WEIGHTS['2spot_settle_spot']
 
         #Road (figure out this settlement logic, also add bonus for ore close)
-        elif self.is_road_setup(node1_id, node2_id, board):
-            self.strategy = 'ROAD'
-            setup_score += SCORING_WEIGHTS['ROAD']
-
+        elif strategy == 'ROAD':
             road_spots = self.find_accessible_settle_spots(board, [node1_id, node2_id])
             setup_score += len(road_spots) * SCORING_WEIGHTS['ROAD_settle_spot_magnifier']
 
         #cities and roads (add bonus for sheep close):
-        elif self.is_city_and_roads_setup(node1_id, node2_id, board):
-            self.strategy = 'CITIES&ROADS'
-            setup_score += SCORING_WEIGHTS['CITIES&ROADS'] 
-            setup_score += self.city_and_roads_balance_score(node1_id, node2_id, board)
-
-        #balanced
-        elif self.is_balanced_setup(node1_id, node2_id, board):
-            self.strategy = 'BALANCED'
-            setup_score += SCORING_WEIGHTS['BALANCED']
-            if self.check_settle_spot(board, {node1_id, node2_id}):
-                setup_score += SCORING_WEIGHTS['2spot_settle_spot']
-
-        #port setup
-        elif self.is_port_setup(node1_id, node2_id, board):
-            self.strategy = 'PORT'
-            setup_score += SCORING_WEIGHTS['PORT']
-        
-        else:
-            self.strategy = 'PRODUCTION'
-            setup_score += SCORING_WEIGHTS['PRODUCTION']
+        elif strategy == 'CITIES&ROADS':
+            setup_score += strategies.city_and_roads_balance_score(profile, SCORING_WEIGHTS['CITIES&ROADS_balance_score'])
         
-        return setup_score
+        return setup_score, strategy
 
     
     
@@ -384,7 +441,8 @@ class Bot:
         k = self.opponents_before_second_pick()
         open_nodes = self.generate_candidate_nodes(board, exclude_nodes=taken_nodes)
         # score every open node
-        scored = [(n, self.score_node(n, board)) for n in open_nodes]
+        node_scores = self.node_scores(board)
+        scored = [(n, node_scores[n]) for n in open_nodes]
         # sort descending by score
         scored.sort(key=lambda x: (-x[1], x[0]))
         # take the top k+m candidates
@@ -394,390 +452,88 @@ class Bot:
         return picks
     
     def opponents_before_second_pick(self):
-        if self.player_id == 0:
-            return 6
-        elif self.player_id == 1:
-            return 4
-        elif self.player_id == 2:
-            return 2
-        elif self.player_id == 3:
-            return 0
-        else:
+        #snake draft: everyone after us picks twice before our second pick
+        if not 0 <= self.player_id < self.total_players:
             raise ValueError("Invalid turn position")
+        return 2 * (self.total_players - 1 - self.player_id)
             
     def generate_candidate_nodes(self, board, exclude_nodes = None):
         #allow for some nodes to be blocked off
-        if exclude_nodes is None:
-            exclude_nodes = set()
-        
-        valid_nodes = []
-
-        for node_id, node in board.nodes.items():
-            if node.owner is not None or node_id in exclude_nodes:
-                continue
-            
-            neighbors = board.nodes[node_id].connected_nodes
-            if any(board.nodes[n_id].owner is not None or n_id in exclude_nodes for n_id in neighbors):
-                continue
-
-            valid_nodes.append(node_id)
-        
-        return valid_nodes
-    
-    
-    
-
-
-
-
-
-
-
-
-
-
-
-
-
+        return board.mask_to_nodes(board.open_mask(exclude_nodes))
     
     
     
     #These are helper functions for node scoring
     
     def check_num_diversity(self, node_id, board, node_id2 = None):
-        dice_numbers = set()
-        for hex in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex]
-            if hex_obj.resource != 'desert':
-                dice_numbers.add(hex_obj.dice_number)
+        analysis = board.analysis
         if node_id2:
-            for hex in board.nodes[node_id2].adj_hexes:
-                hex_obj = board.hexes[hex]
-                if hex_obj.resource != 'desert':
-                    dice_numbers.add(hex_obj.dice_number)
-            return len(dice_numbers)
-        return len(dice_numbers) == 3
+            return len(analysis.pair_profile(node_id, node_id2).numbers)
+        return len(analysis.node_dice[node_id]) == 3
     
 
     def check_res_synergy(self, node_id, board):
-        resources = set()
-        for hex_index in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex_index]
-            resources.add(hex_obj.resource)
-
-        for pair in constants.SYNERGY_RESOURCES:
-            if all(res in resources for res in pair):
-                return True
-        return False
+        return board.analysis.node_res_synergy[node_id]
 
     def check_port(self, node_id, board):
-        ports = set()
-        for hex in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex]
-            for id in hex_obj.node_ids:
-                node = board.nodes[id]
-                if node.port:
-                    ports.add(node.port)
-        return ports
+        #ports of every node on the hexes around node_id
+        return board.analysis.node_ports[node_id]
 
     def check_port_synergy(self, node_id, board):
-        ports = self.check_port(node_id, board)
-        for hex_index in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex_index]
-            for port in ports:
-                if port in ['3:1']:
-                    continue
-                if '_' in port:
-                    port_resource = port.split('_')[1]
-                    if port_resource == hex_obj.resource and constants.PIP_WEIGHTS[hex_obj.dice_number] >= 3:
-                        return True
-        return False
+        return board.analysis.node_port_synergy[node_id]
     
     def check_port_synergy_dual(self, node1_id, node2_id, board):
-        ports_1 = self.check_port(node1_id, board)
-        ports_2 = self.check_port(node2_id, board)
-        all_ports = ports_1 | ports_2
-
-        # Combine hexes from both nodes (deduplicated)
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-
-        # Tally total pip weights per resource across the two nodes
-        resource_pip_totals = {}
-
-        for hex_index in hex_indices:
-            hex_obj = board.hexes[hex_index]
-            if hex_obj.dice_number is None:
-                continue
-            pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-            res = hex_obj.resource
-            resource_pip_totals[res] = resource_pip_totals.get(res, 0) + pip
-
-        # Check each resource-specific port for pip synergy
-        for port in all_ports:
-            if '_' not in port:
-                continue  # skip '3:1' ports or malformed entries
-            port_resource = port.split('_')[1]
-            if resource_pip_totals.get(port_resource, 0) >= 4:
-                return True
-
-        return False
+        return strategies.has_port_synergy(board.analysis.pair_profile(node1_id, node2_id))
 
     def analyze_resources(self, board):
-        resource_scores = {}
-
-        # Sort hexes deterministically by resource name and dice number (as fallback if no ID exists)
-        sorted_hexes = sorted(
-            board.hexes,
-            key=lambda h: (h.resource or "", h.dice_number or 0)
-        )
-
-        for resource in constants.RESOURCES:
-            resource_pipcount = 0
-            for hex in sorted_hexes:
-                if hex.resource != resource:
-                    continue
-                resource_pipcount += constants.PIP_WEIGHTS.get(hex.dice_number, 0)
-            
-            avg = resource_pipcount / constants.TILE_DISTRIBUTION[resource]
-            if avg < 2.6:
-                resource_scores[resource] = 'scarce'
-            elif avg > 3.87:
-                resource_scores[resource] = 'plentiful'
-            else:
-                resource_scores[resource] = 'normal'
-
-        return resource_scores
+        return board.analysis.scarcity
                 
 
     def score_pips(self, node_id, board, node_id2 = None):
-        pip_score = 0
-        for hex_index in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex_index]
-            if hex_obj.dice_number is not None:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_score += pip
+        pips = board.analysis.node_pips
         if not node_id2:
-            return pip_score
-        for hex_index in board.nodes[node_id2].adj_hexes:
-                hex_obj = board.hexes[hex_index]
-                if hex_obj.dice_number is not None:
-                    pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                    pip_score += pip
-        return pip_score
+            return pips[node_id]
+        return pips[node_id] + pips[node_id2]
     
     def check_corner(self, hex):
-        scanned_nodes = sorted(hex.node_ids)
+        return frozenset(hex.node_ids) in CORNER_NODE_SETS
 
-        for corner_node_list in constants.CORNER_HEXES.values():
-            if scanned_nodes == sorted(corner_node_list):
-                return True
-        return False
+    #pair strategy checks, see strategies.py
 
     def is_ows_setup(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-        resources = {board.hexes[i].resource for i in hex_indices if board.hexes[i].resource != 'desert'}
-        return resources.issubset({'ore', 'wheat', 'sheep'})
+        return strategies.is_ows_setup(board.analysis.pair_profile(node1_id, node2_id))
     
     def ows_pip_balance_score(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-        pip_totals = {'ore': 0, 'wheat': 0, 'sheep': 0}
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            if hex_obj.resource in pip_totals and hex_obj.dice_number is not None:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[hex_obj.resource] += pip
-
-        # Ideal ratio is 4:4:2 or 6:6:3 (ore:wheat:sheep)
-        target = [6, 6, 3]
-        actual = [pip_totals['ore'], pip_totals['wheat'], pip_totals['sheep']]
-
-        # Normalize and compute closeness score (lower is better)
-        def normalize(vec):
-            total = sum(vec)
-            return [x / total if total else 0 for x in vec]
-
-        norm_actual = normalize(actual)
-        norm_target = normalize(target)
-
-        # Score inversely to distance
-        distance = sum(abs(a - b) for a, b in zip(norm_actual, norm_target))
-        score = max(0, 1.5 - distance * SCORING_WEIGHTS['OWS_ratio_bonus_magnifier'])  # scale/tune as needed
-
-        return score
+        profile = board.analysis.pair_profile(node1_id, node2_id)
+        return strategies.ows_pip_balance_score(profile, SCORING_WEIGHTS['OWS_ratio_bonus_magnifier'])
     
     def check_settle_spot(self, board, taken_nodes):
-        possible_nodes = self.generate_candidate_nodes(board, exclude_nodes=taken_nodes)
-        return bool(possible_nodes)
+        return board.open_mask(taken_nodes) != 0
     
     def is_ows_hybrid_setup(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-        
-        pip_totals = {'ore': 0, 'wheat': 0}
-        other_resources = set()
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            res = hex_obj.resource
-            if res in ['ore', 'wheat'] and hex_obj.dice_number is not None:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[res] += pip
-            elif res not in ['ore', 'wheat', 'sheep'] and res != 'desert':
-                other_resources.add(res)
-
-        # Must have decent ore and wheat
-        if pip_totals['ore'] >= 3 and pip_totals['wheat'] >= 3:
-            # Must have one non-OWS resource
-            if other_resources:
-                return True
-        
-        return False
+        return strategies.is_ows_hybrid_setup(board.analysis.pair_profile(node1_id, node2_id))
     
     def is_road_setup(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-
-        pip_totals = {'wood': 0, 'brick': 0, 'ore': 0, 'wheat': 0, 'sheep': 0}
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            res = hex_obj.resource
-            if res in pip_totals and hex_obj.dice_number is not None:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[res] += pip
-
-        # Must have at least 3 pip production in both wood and brick
-        if pip_totals['wood'] < 3 or pip_totals['brick'] < 3:
-            return False
-
-        # Must not have ore
-        if pip_totals['ore'] > 0:
-            return False
-        
-        if pip_totals['sheep'] == 0 or pip_totals['wheat'] == 0:
-            return False
-
-        # Check pip ratio closeness (wood/brick ~= 1:1)
-        ratio = pip_totals['wood'] / pip_totals['brick']
-        if 0.66 <= ratio <= 1.5:
-            return True
-
-        return False
-        
+        return strategies.is_road_setup(board.analysis.pair_profile(node1_id, node2_id))
 
     def is_city_and_roads_setup(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-
-        pip_totals = {'ore': 0, 'wheat': 0, 'wood': 0, 'brick': 0}
-        all_resources = set()
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            if hex_obj.dice_number is None:
-                continue
-            res = hex_obj.resource
-            if res in pip_totals:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[res] += pip
-                all_resources.add(res)
-            elif res != 'desert':
-                return False  # disqualify if sheep is present
-
-        # Must have only ore, wheat, wood, and brick
-        if not all_resources.issubset({'ore', 'wheat', 'wood', 'brick'}):
-            return False
-
-        return True
+        return strategies.is_city_and_roads_setup(board.analysis.pair_profile(node1_id, node2_id))
     
     def city_and_roads_balance_score(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-
-        pip_totals = {'ore': 0, 'wheat': 0, 'wood': 0, 'brick': 0}
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            if hex_obj.dice_number is None:
-                continue
-            res = hex_obj.resource
-            if res in pip_totals:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[res] += pip
-
-        cities = pip_totals['ore'] + pip_totals['wheat']
-        roads = pip_totals['wood'] + pip_totals['brick']
-
-        if cities == 0 or roads == 0:
-            return 0
-
-        ratio = cities / roads
-        # Closer to 1 is better
-        distance = abs(ratio - 1)
-        score = max(0, 1.5 - distance * SCORING_WEIGHTS['CITIES&ROADS_balance_score'])  # tune scale
-
-        return score
+        profile = board.analysis.pair_profile(node1_id, node2_id)
+        return strategies.city_and_roads_balance_score(profile, SCORING_WEIGHTS['CITIES&ROADS_balance_score'])
 
     def is_balanced_setup(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-
-        pip_totals = {'ore': 0, 'wheat': 0, 'sheep': 0, 'wood': 0, 'brick': 0}
-        seen_resources = set()
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            res = hex_obj.resource
-            if res in pip_totals and hex_obj.dice_number is not None:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[res] += pip
-                seen_resources.add(res)
-
-        # Check all 5 resources are present
-        if seen_resources != set(pip_totals.keys()):
-            return False
-
-        # Require wheat support
-        if pip_totals['wheat'] < 3:
-            return False
-
-        return True
+        return strategies.is_balanced_setup(board.analysis.pair_profile(node1_id, node2_id))
     
     def is_port_setup(self, node1_id, node2_id, board):
-        hex_indices = set(board.nodes[node1_id].adj_hexes + board.nodes[node2_id].adj_hexes)
-
-        pip_totals = {'ore': 0, 'wheat': 0, 'sheep': 0, 'wood': 0, 'brick': 0}
-
-        for i in hex_indices:
-            hex_obj = board.hexes[i]
-            res = hex_obj.resource
-            if res in pip_totals and hex_obj.dice_number is not None:
-                pip = constants.PIP_WEIGHTS[hex_obj.dice_number]
-                pip_totals[res] += pip
-        
-        total_ports = (self.check_port(node1_id, board) | self.check_port(node2_id, board))
-        
-        for port in total_ports:
-            if port == '3:1':
-                continue
-            if '_' in port:
-                port_resource = port.split('_')[1]
-                for resource, pips in pip_totals.items():
-                    if pip_totals.get(port_resource, 0) >= 9:
-                        return True
-        return False
+        return strategies.is_port_setup(board.analysis.pair_profile(node1_id, node2_id))
     
     def threehex_check(self, node_id, board):
-        seen = 0
-        for hex in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex]
-            res = hex_obj.resource
-            if res != 'desert':
-                seen += 1
-        return seen
+        return board.analysis.node_land_hexes[node_id]
     
     def ore_check(self, node_id, board):
-        for hex_index in board.nodes[node_id].adj_hexes:
-            hex_obj = board.hexes[hex_index]
-            if hex_obj.resource == 'ore' and hex_obj.dice_number >= 3:
-                return True
-        return False
+        return board.analysis.node_has_ore[node_id]
 
     def valid_settlement_pair(self, node1_id, node2_id, board):
         if node1_id == node2_id:
@@ -793,27 +549,17 @@ class Bot:
         if exclude is None:
             exclude = set(start_node_ids)
 
-        visited = set(start_node_ids)
-        queue = [(nid, 0) for nid in start_node_ids]
-        valid_spots = set()
-
-        while queue:
-            current, depth = queue.pop(0)
-            if depth >= max_depth:
-                continue
-
-            for neighbor in board.nodes[current].connected_nodes:
-                if neighbor in visited:
-                    continue
-                visited.add(neighbor)
-                queue.append((neighbor, depth + 1))
-                if neighbor not in exclude and board.nodes[neighbor].owner is None:
-                    # Check if neighbor is legally settleable
-                    neighbors = board.nodes[neighbor].connected_nodes
-                    if all(board.nodes[n].owner is None for n in neighbors):
-                        valid_spots.add(neighbor)
-
-        return valid_spots
+        # every node within max_depth steps of a start node, minus the starts themselves
+        topo = board.topology
+        starts = [topo.node_index[nid] for nid in start_node_ids]
+        reachable = 0
+        for i in starts:
+            reachable |= topo.ball_mask(i, max_depth)
+        reachable &= ~board.nodes_mask(start_node_ids)
+
+        # keep the legally settleable ones
+        valid = reachable & ~board.nodes_mask(exclude) & ~board.blocked_mask
+        return set(board.mask_to_nodes(valid))
     
     
     def get_next_road_towards_settlement(self, game, player, max_distance=4, top_n=5):
@@ -821,10 +567,11 @@ class Bot:
 
         # 1) build a list of your top‐N settlement targets by score
         cands = []
+        node_scores = self.node_scores(board)
         for nid in board.nodes:
             if not game.valid_node(nid, player.id):
                 continue
-            score = self.score_node(nid, board)  # or your pip‐based scoring
+            score = node_scores[nid]  # or your pip‐based scoring
             cands.append((score, nid))
         cands.sort(reverse=True)
         cands = [nid for _, nid in cands[:top_n]]
@@ -833,12 +580,10 @@ class Bot:
         def bfs_path_to(target):
             seen = set()
             # start from all your owned nodes & road endpoints
-            frontier = set(player.settlements) | set(player.cities)
-            for road in player.roads:
-                frontier |= set(road)
+            frontier = player.network.node_ids()
 
             queue = deque([(s, []) for s in frontier])
-            seen |= frontier
+            seen.update(frontier)
 
             while queue:
                 node, path = queue.popleft()
@@ -848,7 +593,7 @@ class Bot:
                     continue
                 for nbr in board.nodes[node].connected_nodes:
                     edge = tuple(sorted((node, nbr)))
-                    eobj = game.find_edge(node, nbr)
+                    eobj = board.get_edge(node, nbr)
                     if eobj.owner is not None:      # already built
                         continue
                     if nbr in seen:
@@ -899,22 +644,19 @@ class Bot:
                         continue
                 
 
-            # 2. Try to build city
-            city_targets = [
-                (node_id, sum(board.hexes[h].dice_number or 0 for h in board.nodes[node_id].adj_hexes))
-                for node_id in player.settlements
-            ]
-            city_targets.sort(key=lambda x: -x[1])
-            for node_id, _ in city_targets:
-                
+            # 2. Try to build city (on the best settlement, any settlement is legal once the city is affordable)
+            if game.legal_cities(player):
+                city_targets = [
+                    (node_id, sum(board.hexes[h].dice_number or 0 for h in board.nodes[node_id].adj_hexes))
+                    for node_id in player.settlements
+                ]
+                city_targets.sort(key=lambda x: -x[1])
+                node_id = city_targets[0][0]
                 success, reason = game.build_city(player, node_id)
-                
                 if success:
                     actions.append(f"Built city at {node_id}")
                     built_this_round = True
-                    break
-            if built_this_round:
-                continue
+                    continue
 
             # 3. Try to build settlement
             best_settle = self.best_settlement_location(game, player)
@@ -949,23 +691,9 @@ class Bot:
                         built_this_round = True
                         continue
 
-            connected = set(player.settlements) | set(player.cities)
-            for edge in player.roads:
-                connected |= set(edge)
-            
-            # Compute full and partial affordability for a settlement:
-            settle_cost = constants.COSTS_CARD['settlement']    # e.g. {'wood':1,'brick':1,'sheep':1,'wheat':1}
-            have_all = game.has_required_resources(player, settle_cost)
-
-            # Count how many settlement resources you already hold:
-            have_count = sum(
-                min(player.resources.get(res, 0), req) 
-                for res, req in settle_cost.items()
-            )
-
             # 6. Default road build if resources allow
-            if (best_settle is None or best_settle not in connected) \
-                and game.has_required_resources(player, constants.COSTS_CARD['road']):
+            if (best_settle is None or not player.network.has(best_settle)) \
+                and game.can_afford(player, 'road'):
                     step = self.get_next_road_towards_settlement(game, player)
                     if step:
                         n1, n2 = step
@@ -992,20 +720,9 @@ class Bot:
         best_node = None
         best_score = float('-inf')
 
-        # Gather all connected nodes (from roads + existing settlements/cities)
-        connected_nodes = set()
-        connected_nodes.update(player.settlements)
-        connected_nodes.update(player.cities)
-        for road in player.roads:
-            connected_nodes.update(road)
-
-        for node_id, node in board.nodes.items():
-            if not game.valid_node(node_id, player.id):
-                continue
-
-            # Node must be connected to player’s network
-            if not any(neighbor in connected_nodes for neighbor in node.connected_nodes):
-                continue
+        # open nodes next to the player's network (network.reach = network nodes + their neighbors)
+        for node_id in board.mask_to_nodes(player.network.reach & board.open_mask()):
+            node = board.nodes[node_id]
 
             # Score the node
             pip_score = sum(
@@ -1045,26 +762,18 @@ class Bot:
 
 
         else:
-            # Step 2: Figure out what resource you produce least of (by pip sum)
-            my_pips = defaultdict(int)
-            for node in player.settlements | player.cities:
-                for hex_id in board.nodes[node].adj_hexes:
-                    hex = board.hexes[hex_id]
-                    if hex.dice_number:
-                        my_pips[hex.resource] += constants.PIP_WEIGHTS[hex.dice_number]
-
-            least_produced = min(my_pips, key=my_pips.get)
+            # Step 2: Figure out what resource you produce least of (expected yield out of 36 rolls,
+            # each building counted once, with the robber off the board since we're about to move it)
+            table = production_table(board)
+            my_yield, _ = table.group(player.settlements | player.cities)
+            produced = [k for k in range(len(constants.RESOURCES)) if my_yield[k] > 0] or range(len(constants.RESOURCES))
+            least_produced = min(produced, key=lambda k: my_yield[k])
 
             # Find player who produces most of this resource
             scores = []
             for p in players:
-                pip_total = 0
-                for node_id in p.settlements | p.cities:
-                    for hex_idx in board.nodes[node_id].adj_hexes:
-                        hex = board.hexes[hex_idx]
-                        if hex.resource == least_produced and hex.dice_number:
-                            pip_total += constants.PIP_WEIGHTS[hex.dice_number]
-                scores.append((p, pip_total))
+                their_yield, _ = table.group(p.settlements | p.cities)
+                scores.append((p, their_yield[least_produced]))
 
             max_score = max(pip for _, pip in scores)
             candidates = [p for p, pip in scores if pip == max_score]
@@ -1155,14 +864,7 @@ class Bot:
             return None
 
         # Step 1: Determine starting nodes (connected to player network)
-        start_nodes = set()
-        for edge in board.edges:
-            if edge.owner == player.id:
-                start_nodes.add(edge.node1.id)
-                start_nodes.add(edge.node2.id)
-
-        for node_id in player.settlements | player.cities:
-            start_nodes.add(node_id)
+        start_nodes = player.network.node_ids()
 
         if not start_nodes:
             return None
@@ -1190,7 +892,7 @@ class Bot:
                         continue
 
                     visited_edges.add(edge)
-                    edge_obj = game.get_edge(current, neighbor)
+                    edge_obj = board.get_edge(current, neighbor)
                     if not edge_obj:
                         continue
 
@@ -1209,12 +911,10 @@ class Bot:
             "road": {"wood": 1, "brick": 1}
         }
 
-        def resources_needed(requirements):
-            need = {}
-            for res, amt in requirements.items():
-                if player.resources[res] < amt:
-                    need[res] = amt - player.resources[res]
-            return need
+        def resources_needed(build_type):
+            #missing cards per resource, listed in build_options order
+            deficit = player.resources.deficit(COSTS[build_type])
+            return {res: hand_count(deficit, res) for res in build_options[build_type] if hand_count(deficit, res)}
 
         for build_type in ["city", "settlement", "dev_card", "road"]:
             if build_type == "settlement" and self.strategy == "road":
@@ -1222,7 +922,7 @@ class Bot:
             if build_type == "dev_card" and self.strategy == "road":
                 continue
 
-            needed = resources_needed(build_options[build_type])
+            needed = resources_needed(build_type)
             if 1 <= sum(needed.values()) <= 2:
                 res_list = list(needed.keys())
                 # Pad with duplicates if only one resource needed
@@ -1269,19 +969,16 @@ class Bot:
     
     def try_trade_to_build(self, player, game):
         resources = constants.RESOURCES
-        board = game.board
+        hand = player.resources
 
         def can_build_structure():
             # 1) City on an existing settlement?
-            for nid in player.settlements:
-                node = board.nodes[nid]
-                if node.owner == player.id and node.building_type == 'settlement':
-                    if game.has_required_resources(player, constants.COSTS_CARD['city']):
-                        return True
+            if game.legal_cities(player):
+                return True
 
             # 2) New settlement?
             spot = self.best_settlement_location(game, player)
-            if spot and game.has_required_resources(player, constants.COSTS_CARD['settlement']):
+            if spot and game.can_afford(player, 'settlement'):
                 return True
 
             return False
@@ -1290,26 +987,20 @@ class Bot:
         if can_build_structure():
             return False, "Already able to build"
 
-        # Helper to compute deficits for a given cost
-        def calc_deficit(cost):
-            return {r: max(0, cost.get(r, 0) - player.resources.get(r, 0)) for r in resources}
-
+        # Deficits are packed hands too (hand.py): one slot per resource, hand_total() sums them
         # Decide whether to target settlement or city first based on smaller deficit
-        settle_cost = constants.COSTS_CARD['settlement']
-        city_cost = constants.COSTS_CARD['city']
-        deficit_settle = calc_deficit(settle_cost)
-        deficit_city = calc_deficit(city_cost)
-        sum_def = lambda d: sum(d.values())
-        cost_order = ['settlement', 'city'] if sum_def(deficit_settle) < sum_def(deficit_city) else ['city', 'settlement']
+        deficit_settle = hand.deficit(COSTS['settlement'])
+        deficit_city = hand.deficit(COSTS['city'])
+        cost_order = ['settlement', 'city'] if hand_total(deficit_settle) < hand_total(deficit_city) else ['city', 'settlement']
 
         # Pick first target we actually need to save for
         target_key = None
         target_cost = None
-        deficit = {}
+        deficit = 0
         for key in cost_order:
-            cost = constants.COSTS_CARD[key]
-            d = calc_deficit(cost)
-            if any(d.values()):
+            cost = COSTS[key]
+            d = hand.deficit(cost)
+            if d:
                 target_key = key
                 target_cost = cost
                 deficit = d
@@ -1321,8 +1012,8 @@ class Bot:
         trades_made = []
         while True:
             # Recompute deficit
-            deficit = calc_deficit(target_cost)
-            total_deficit = sum_def(deficit)
+            deficit = hand.deficit(target_cost)
+            total_deficit = hand_total(deficit)
             # Check if now buildable
             if total_deficit == 0:
                 msg = " and then ".join(trades_made) + " and now can build" if trades_made else "Now can build"
@@ -1333,19 +1024,16 @@ class Bot:
             # Find best trade by maximum reduction in total deficit
             best_score = 0
             best_trade = None
-            for give, have in player.resources.items():
-                rate = game.get_port_rate(player, give) or 4
+            for give, have in hand.items():
+                rate = player.trade_rates[give]
                 if have < rate:
                     continue
-                for need, miss_amt in deficit.items():
-                    if need == give or miss_amt == 0:
+                for need in resources:
+                    if need == give or not hand_count(deficit, need):
                         continue
-                    # simulate trade
-                    new_res = player.resources.copy()
-                    new_res[give] -= rate
-                    new_res[need] += 1
-                    new_def = {r: max(0, target_cost.get(r, 0) - new_res.get(r, 0)) for r in resources}
-                    score = total_deficit - sum_def(new_def)
+                    # simulate trade on the packed hand, no copy
+                    new_hand = hand.packed - hand_unit(give, rate) + hand_unit(need)
+                    score = total_deficit - hand_total(hand_deficit(new_hand, target_cost))
                     if score > best_score:
                         best_score = score
                         best_trade = (give, need, rate)
@@ -1375,7 +1063,7 @@ class Bot:
         # Sort by most‐to‐fewest
         for res, amt in sorted(player.resources.items(), key=lambda x: -x[1]):
             # how many units to give up?
-            rate = game.get_port_rate(player, res) or 4
+            rate = player.trade_rates[res]
             if amt < rate:
                 # not enough to pay even a bank trade
                 continue
@@ -0,0 +1,187 @@
+import argparse
+import os
+import sys
+
+'''
+Command line entry point:
+    python src/cli.py simulate --trials 500
+    python src/cli.py place --seat 2 --taken node_9 node_20
+    python src/cli.py place --seat 1 --rollouts 128 --workers 4
+    python src/cli.py tune --optuna-trials 50 --trials 2000
+    python src/cli.py track
+    python src/cli.py generate boards.bin --count 100000 --seed 1
+    python src/cli.py book --boards boards.bin --count 1000 --samples 50
+
+Every command imports what it needs when it runs, so nothing heavy (pandas, optuna,
+numpy) is loaded just to parse arguments.
+'''
+
+EXPERIMENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'experiments')
+
+
+def load_boards(args):
+    #board source shared by simulate/place: a board file, a freshly generated batch, or None (TEST_BOARD)
+    if getattr(args, 'boards', None):
+        from board_io import open_boards
+        return open_boards(args.boards)
+    if getattr(args, 'random_boards', None):
+        from board_batch import generate_boards
+        return generate_boards(args.random_boards, args.board_seed)
+    return None
+
+
+def load_rollout_placer(args):
+    #--rollouts N switches the smart bot to rollout placement
+    if not getattr(args, 'rollouts', 0):
+        return None
+    from rollout_placement import RolloutPlacer
+    return RolloutPlacer(
+        candidates = args.rollout_candidates, rollouts = args.rollouts, max_seconds = args.rollout_seconds,
+        max_turns = args.rollout_turns, workers = args.workers
+    )
+
+
+def add_rollout_args(parser):
+    parser.add_argument('--rollouts', type=int, default=0, help='place by game rollouts, N games per decision (0 = heuristic)')
+    parser.add_argument('--rollout-candidates', type=int, default=8, help='top heuristic pairs to play out')
+    parser.add_argument('--rollout-turns', type=int, default=60, help='turns per rollout game')
+    parser.add_argument('--rollout-seconds', type=float, default=None, help='time cap per decision')
+    parser.add_argument('--workers', type=int, default=1, help='processes to run rollouts in')
+
+
+def cmd_simulate(args):
+    import main
+    from placement_cache import PlacementCache
+
+    cache = PlacementCache(args.cache_size) if args.cache_size else None
+    book = None
+    if args.book:
+        from opening_book import OpeningBook
+        book = OpeningBook(args.book)
+    placer = load_rollout_placer(args)
+    df = main.run_trials(args.trials, boards=load_boards(args), placement_cache=cache, opening_book=book, rollout_placer=placer)
+    if placer is not None:
+        placer.close()
+    main.report(df)
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+def cmd_place(args):
+    import random
+    import constants
+    from board import Board
+    from bot import Bot
+
+    random.seed(args.seed)
+    boards = load_boards(args)
+    board = boards[args.index] if boards is not None else Board(test_hexes = constants.TEST_BOARD)
+
+    placer = load_rollout_placer(args)
+    bot = Bot(player_id = args.seat, total_players = 4, rollout_placer = placer)
+    taken = set(args.taken)
+    for node_id in args.taken:
+        taken.update(board.nodes[node_id].connected_nodes)
+
+    first = bot.choose_first_placement(board, taken)
+    taken.add(first)
+    taken.update(board.nodes[first].connected_nodes)
+    second = bot.choose_second_placement(board, first, taken)
+    print(f'seat {args.seat}: first settlement {first}, planned second {second} ({bot.strategy})')
+    if placer is not None:
+        placer.close()
+        print(f'{placer.games_played} rollout games')
+
+
+def cmd_tune(args):
+    import main
+    main.tune(n_trials = args.optuna_trials, trials = args.trials)
+
+
+def cmd_track(args):
+    if EXPERIMENTS_DIR not in sys.path:
+        sys.path.insert(0, EXPERIMENTS_DIR)
+    from tracker import Tracker
+    Tracker(board_file = args.boards, board_index = args.index)
+
+
+def cmd_generate(args):
+    from board_batch import generate_boards
+    from board_io import write_boards
+    write_boards(args.path, generate_boards(args.count, args.seed))
+    print(f'wrote {args.count} boards to {args.path}')
+
+
+def cmd_book(args):
+    from opening_book import DEFAULT_BOOK_PATH, build_book
+    boards = load_boards(args)
+    if boards is None:
+        print('book needs a board corpus (--boards or --random-boards)')
+        return
+    if args.count is not None:
+        boards = [boards[i] for i in range(min(args.count, len(boards)))]
+    path = args.out or DEFAULT_BOOK_PATH
+    book = build_book(boards, path = path, samples = args.samples, seed = args.seed)
+    print(f'{len(book)} entries in {path}')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='catan', description='Catan placement simulations')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    simulate = sub.add_parser('simulate', help='backtest the smart bot against random placers')
+    simulate.add_argument('--trials', type=int, default=5000)
+    simulate.add_argument('--boards', help='board file (board_io) to cycle through instead of TEST_BOARD')
+    simulate.add_argument('--random-boards', type=int, help='play on N freshly generated random boards')
+    simulate.add_argument('--board-seed', type=int, default=None)
+    simulate.add_argument('--cache-size', type=int, default=0, help='placement LRU size, 0 = off')
+    simulate.add_argument('--out', help='write the per-game results to this csv')
+    simulate.add_argument('--book', help='opening book (json) to look placements up in before searching')
+    add_rollout_args(simulate)
+    simulate.set_defaults(func=cmd_simulate)
+
+    place = sub.add_parser('place', help='print the placement the smart bot picks')
+    place.add_argument('--seat', type=int, default=0)
+    place.add_argument('--taken', nargs='*', default=[], help='nodes already settled')
+    place.add_argument('--boards', help='board file to read the board from')
+    place.add_argument('--index', type=int, default=0)
+    place.add_argument('--seed', type=int, default=None)
+    add_rollout_args(place)
+    place.set_defaults(func=cmd_place, random_boards=None)
+
+    tune = sub.add_parser('tune', help='optuna search over the strategy weights')
+    tune.add_argument('--optuna-trials', type=int, default=50)
+    tune.add_argument('--trials', type=int, default=5000, help='games per optuna trial')
+    tune.set_defaults(func=cmd_tune)
+
+    track = sub.add_parser('track', help='interactive resource tracker for a live game')
+    track.add_argument('--boards', help='board file to load the board from')
+    track.add_argument('--index', type=int, default=0)
+    track.set_defaults(func=cmd_track)
+
+    generate = sub.add_parser('generate', help='write a file of random boards')
+    generate.add_argument('path')
+    generate.add_argument('--count', type=int, default=100000)
+    generate.add_argument('--seed', type=int, default=None)
+    generate.set_defaults(func=cmd_generate)
+
+    book = sub.add_parser('book', help='precompute the placement opening book for a board corpus')
+    book.add_argument('--boards', help='board file (board_io)')
+    book.add_argument('--random-boards', type=int, help='N freshly generated random boards')
+    book.add_argument('--board-seed', type=int, default=None)
+    book.add_argument('--count', type=int, default=None, help='only the first N boards of the file')
+    book.add_argument('--samples', type=int, default=50, help='drafts played per board and seat')
+    book.add_argument('--seed', type=int, default=0)
+    book.add_argument('--out', default=None, help='book path, defaults to data/opening_book.json')
+    book.set_defaults(func=cmd_book)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
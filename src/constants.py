@@ -52,6 +52,10 @@ DEV_DECK = ['knight'] * 14 + ['victory_point'] * 5 + ['road_building'] * 2 + ['m
 
 PORT_TYPES = ['3:1'] * 4 + ['2:1_brick', '2:1_wood', '2:1_ore', '2:1_wheat', '2:1_sheep']
 
+#integer codes for array/binary boards: tile id = index in TILE_TYPES, port id = index in PORT_KINDS
+TILE_TYPES = RESOURCES + ['desert']
+PORT_KINDS = ['3:1'] + [f'2:1_{res}' for res in RESOURCES]
+
 PORT_LOCATION = [
     'node_0','node_1',
     'node_6','node_7', 
@@ -0,0 +1,141 @@
+import numpy as np
+from pair_scoring import score_pairs
+
+'''
+Snake draft search: the expected placement value of each first pick.
+
+With n players the draft goes 0..n-1 then n-1..0, so between our two picks the other seats
+make 2 * (n - 1 - seat) picks. Those are chance nodes (an opponent model gives a probability per
+open node) and at our second pick we take the best open partner for our first settlement, so
+  value(first) = E[ max over open x of pair total(first, x) ]
+with pair totals from pair_scoring. States are 54 bit taken masks (settled nodes and their
+neighbours, the same set the draft calls taken_nodes).
+
+Two things keep it small enough to run inside a placement call:
+  - only our top `width` second candidates are tracked; an opponent pick that can't block any
+    of them still open is folded into one branch carried by the likeliest such pick,
+  - the transposition table is keyed by (first pick, which candidates are still open, picks left),
+    so picks that leave our options the same are only searched once.
+Both are exact for the greedy model; for spread out models (uniform) they only blur which
+harmless node got taken, which barely moves the later probabilities.
+'''
+
+
+class UniformModel:
+    '''game.pick_random_settle: any node not taken, equally likely.'''
+    def distribution(self, search, mask):
+        nodes = search.topology.mask_to_ids(search.topology.all_nodes_mask & ~mask)
+        return [(y, 1 / len(nodes)) for y in nodes] if nodes else []
+
+
+class GreedyModel:
+    '''The open node with the best score_node (ties by node id, the order simulate_opponent_picks sorts in).'''
+    def distribution(self, search, mask):
+        for y in search.by_score:
+            if not mask >> y & 1:
+                return [(y, 1.0)]
+        return []
+
+
+class TopModel:
+    '''One of the `width` best open nodes by score_node, equally likely.'''
+    def __init__(self, width=3):
+        self.width = width
+
+    def distribution(self, search, mask):
+        top = []
+        for y in search.by_score:
+            if not mask >> y & 1:
+                top.append(y)
+                if len(top) == self.width:
+                    break
+        return [(y, 1 / len(top)) for y in top]
+
+
+class MixedModel:
+    '''Weighted mix of other models, e.g. MixedModel((0.7, GreedyModel()), (0.3, UniformModel())).'''
+    def __init__(self, *weighted):
+        total = sum(weight for weight, _ in weighted)
+        self.weighted = [(weight / total, model) for weight, model in weighted]
+
+    def distribution(self, search, mask):
+        probs = {}
+        for weight, model in self.weighted:
+            for y, p in model.distribution(search, mask):
+                probs[y] = probs.get(y, 0.0) + weight * p
+        return list(probs.items())
+
+
+class DraftSearch:
+    def __init__(self, board, weights, node_scores, seat, num_players=4, model=None, width=6, no_second=0.0):
+        self.topology = board.topology
+        self.closed = self.topology.closed_masks
+        names = self.topology.node_names
+        self.by_score = sorted(range(len(names)), key=lambda i: (-node_scores[i], names[i]))
+        self.totals, _ = score_pairs(board, weights, node_scores)
+        self.picks_between = 2 * (num_players - 1 - seat)
+        self.model = model or UniformModel()
+        self.width = width
+        self.no_second = no_second #value when no second settlement is left at all
+        self.seconds = {}
+        self.table = {}
+
+    def taken_mask(self, board, taken_nodes):
+        return board.blocked_mask | board.nodes_mask(taken_nodes)
+
+    def second_order(self, first):
+        #partners of `first` best pair total first (argmax order: lowest index on ties)
+        order = self.seconds.get(first)
+        if order is None:
+            row = self.totals[first]
+            ranked = np.argsort(-row, kind='stable')
+            order = self.seconds[first] = [
+                (x, value) for x, value in zip(ranked.tolist(), row[ranked].tolist()) if not self.closed[first] >> x & 1
+            ]
+        return order
+
+    def best_second(self, first, mask):
+        for x, value in self.second_order(first):
+            if not mask >> x & 1:
+                return x, value
+        return None, self.no_second
+
+    def first_pick_values(self, taken_mask, firsts=None):
+        '''{first node index: expected pair total} for every open first pick (or just `firsts`).'''
+        if firsts is None:
+            firsts = self.topology.mask_to_ids(self.topology.all_nodes_mask & ~taken_mask)
+        return {first: self.first_value(first, taken_mask) for first in firsts}
+
+    def first_value(self, first, taken_mask):
+        mask = taken_mask | self.closed[first]
+        watched = 0
+        for x, _ in self.second_order(first):
+            if not mask >> x & 1:
+                watched |= 1 << x
+                if watched.bit_count() == self.width:
+                    break
+        return self.value(first, watched, mask, self.picks_between)
+
+    def value(self, first, watched, mask, picks_left):
+        key = (first, watched & ~mask, picks_left)
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached
+
+        dist = self.model.distribution(self, mask) if picks_left else []
+        if not dist:
+            result = self.best_second(first, mask)[1]
+        else:
+            live = watched & ~mask
+            result, folded, carrier, carrier_p = 0.0, 0.0, None, -1.0
+            for y, p in dist:
+                if self.closed[y] & live:
+                    result += p * self.value(first, watched, mask | self.closed[y], picks_left - 1)
+                else:
+                    folded += p
+                    if p > carrier_p:
+                        carrier, carrier_p = y, p
+            if carrier is not None:
+                result += folded * self.value(first, watched, mask | self.closed[carrier], picks_left - 1)
+        self.table[key] = result
+        return result
@@ -1,24 +1,59 @@
 import random
-from constants import RESOURCES, COSTS_CARD, DEV_DECK
-from bot_play import Bot
+from constants import RESOURCES, DEV_DECK
 from collections import deque
+from longest_road import LongestRoads
+from network import RoadNetwork
+from actions import (
+    encode, decode, SETTLEMENT, CITY, ROAD, BUY_DEV, KNIGHT, MONOPOLY, YEAR_OF_PLENTY, ROAD_BUILDING, BANK_TRADE
+)
+from topology import TOPOLOGY
+from hand import Hand, COSTS, pack, affordable
 
 class Player:
     def __init__(self, player_id):
         self.id = player_id
-        self.resources = {r: 0 for r in ['wood', 'ore', 'sheep', 'brick', 'wheat']}
+        self.resources = Hand() #dict view over one packed int, see hand.py
         self.dev_cards = []
         self.unplayable_dev_cards = []
         self.played_knights = 0
         self.settlements = set()
         self.cities = set()
         self.roads = set()
+        self.network = RoadNetwork(TOPOLOGY) #settlements/cities/roads as bitmasks + union-find, see network.py
+        self.trade_rates = dict.fromkeys(RESOURCES, 4) #resource given -> bank rate, lowered by add_port
         self.points = 0
         self.played_dev_this_turn = False
     
     def __repr__(self):
         return f'Player {self.id}'
 
+    def snapshot(self):
+        return (
+            self.resources.packed, tuple(self.dev_cards), tuple(self.unplayable_dev_cards),
+            self.played_knights, frozenset(self.settlements), frozenset(self.cities),
+            frozenset(self.roads), self.points, self.played_dev_this_turn, tuple(self.trade_rates.values())
+        )
+
+    def restore(self, snapshot):
+        (hand, dev_cards, unplayable, self.played_knights, settlements, cities,
+         roads, self.points, self.played_dev_this_turn, trade_rates) = snapshot
+        self.resources.packed = hand
+        self.dev_cards = list(dev_cards)
+        self.unplayable_dev_cards = list(unplayable)
+        self.settlements = set(settlements)
+        self.cities = set(cities)
+        self.roads = set(roads)
+        self.network.rebuild(self.settlements, self.cities, self.roads)
+        self.trade_rates = dict(zip(self.trade_rates, trade_rates))
+
+    def add_port(self, port):
+        #port strings are PORT_TYPES entries: '3:1' or '2:1_<resource>'
+        if port == '3:1':
+            for res, rate in self.trade_rates.items():
+                self.trade_rates[res] = min(rate, 3)
+        elif port is not None:
+            self.trade_rates[port[4:]] = 2
+
 class Game:
     def __init__(self, board, num_players=4):
         self.board = board
@@ -30,6 +65,140 @@ class Game:
         self.setup_phase = True
         self.largest_army_player_id = None
         self.longest_road_player_id = None
+        self.longest_roads = LongestRoads(board)
+
+
+    #SNAPSHOTS for lookahead: cheap tuples instead of deepcopy-ing the whole object graph
+
+    def snapshot(self):
+        return (
+            self.board.snapshot(),
+            tuple(p.snapshot() for p in self.players),
+            tuple(self.dev_deck),
+            self.largest_army_player_id, self.longest_road_player_id,
+            self.current_player_turn, self.turn, self.setup_phase
+        )
+
+    def restore(self, snapshot):
+        (board_state, player_states, dev_deck, self.largest_army_player_id, self.longest_road_player_id,
+         self.current_player_turn, self.turn, self.setup_phase) = snapshot
+        self.board.restore(board_state)
+        for player, state in zip(self.players, player_states):
+            player.restore(state)
+        self.dev_deck = list(dev_deck)
+
+
+    #LEGAL ACTIONS: what the build / dev / trade methods below would accept right now, as actions.py ints
+    #read straight off the board masks and player.network, nothing is tried and undone
+
+    def legal_actions(self, player):
+        return (
+            self.legal_settlements(player) + self.legal_cities(player) + self.legal_roads(player)
+            + self.legal_dev_actions(player) + self.legal_trades(player)
+        )
+
+    def legal_settlements(self, player):
+        if len(player.settlements) == 5:
+            return []
+        mask = self.board.open_mask()
+        if not self.setup_phase:
+            if not self.can_afford(player, 'settlement'):
+                return []
+            mask &= player.network.nodes
+        return [encode(SETTLEMENT, i) for i in self.board.topology.mask_to_ids(mask)]
+
+    def legal_cities(self, player):
+        if not self.can_afford(player, 'city'):
+            return []
+        index = self.board.topology.node_index
+        return [encode(CITY, i) for i in sorted(index[node_id] for node_id in player.settlements)]
+
+    def legal_roads(self, player, free=False):
+        if not free and not self.can_afford(player, 'road'):
+            return []
+        return [encode(ROAD, e) for e in self.board.topology.mask_to_ids(player.network.frontier(self.board))]
+
+    def legal_dev_actions(self, player):
+        actions = []
+        if self.dev_deck and self.can_afford(player, 'dev_card'):
+            actions.append(encode(BUY_DEV))
+        if player.played_dev_this_turn:
+            return actions
+
+        playable = set(player.dev_cards) - set(player.unplayable_dev_cards)
+        if 'knight' in playable:
+            actions += self.knight_actions(player)
+        if 'monopoly' in playable:
+            actions += [encode(MONOPOLY, r) for r in range(len(RESOURCES))]
+        if 'year_of_plenty' in playable:
+            actions += [encode(YEAR_OF_PLENTY, a, b) for a in range(len(RESOURCES)) for b in range(a, len(RESOURCES))]
+        if 'road_building' in playable:
+            actions += self.road_building_actions(player)
+        return actions
+
+    def knight_actions(self, player):
+        #robber onto any other hex, one action per player there who has a card to steal (or none)
+        actions = []
+        for h, node_ids in enumerate(self.board.topology.hex_node_names):
+            if h == self.board.robber_hex:
+                continue
+            targets = set()
+            for node_id in node_ids:
+                owner = self.board.nodes[node_id].owner
+                if owner is not None and owner != player.id and sum(self.players[owner].resources.values()) > 0:
+                    targets.add(owner)
+            actions += [encode(KNIGHT, h, t + 1) for t in sorted(targets)] or [encode(KNIGHT, h)]
+        return actions
+
+    def road_building_actions(self, player):
+        #(first, second) in build order: first on the frontier now, second buildable once first is down.
+        #a pair that works both ways is listed once, lower edge first; a lone road only when nothing can follow it
+        topo, network = self.board.topology, player.network
+        empty = ~self.board.occupied_edges_mask
+        frontier = network.frontier(self.board)
+        pairs = set()
+        for e in topo.mask_to_ids(frontier):
+            a, b = topo.edge_ends[e]
+            after = (network.touching | topo.node_edge_masks[a] | topo.node_edge_masks[b]) & empty & ~(1 << e)
+            for f in topo.mask_to_ids(after):
+                #f on the frontier too: f then e works as well (e is still on the frontier after f)
+                pairs.add((min(e, f), max(e, f) + 1) if frontier >> f & 1 else (e, f + 1))
+            if not after:
+                pairs.add((e, 0))
+        return [encode(ROAD_BUILDING, a, b) for a, b in sorted(pairs)]
+
+    def legal_trades(self, player):
+        actions = []
+        for give, res in enumerate(RESOURCES):
+            if player.resources[res] >= self.trade_rate(player, res):
+                actions += [encode(BANK_TRADE, give, get) for get in range(len(RESOURCES)) if get != give]
+        return actions
+
+    def apply_action(self, player, action):
+        '''Play an encoded action through the normal game methods, returns their (success, message).'''
+        kind, a, b = decode(action)
+        topo = self.board.topology
+        if kind == SETTLEMENT:
+            return self.build_settlement(player, topo.node_names[a])
+        if kind == CITY:
+            return self.build_city(player, topo.node_names[a])
+        if kind == ROAD:
+            return self.build_road(player, *(topo.node_names[i] for i in topo.edge_ends[a]))
+        if kind == BUY_DEV:
+            return self.buy_dev_card(player)
+        if kind == KNIGHT:
+            return self.play_dev_card_bot(player, 'knight', hex_index = a, target_id = b - 1 if b else None)
+        if kind == MONOPOLY:
+            return self.play_dev_card_bot(player, 'monopoly', mono_res = RESOURCES[a])
+        if kind == YEAR_OF_PLENTY:
+            return self.play_dev_card_bot(player, 'year_of_plenty', yop_res1 = RESOURCES[a], yop_res2 = RESOURCES[b])
+        if kind == ROAD_BUILDING:
+            edges = [a] + ([b - 1] if b else [])
+            road_pair = [tuple(topo.node_names[i] for i in topo.edge_ends[e]) for e in edges]
+            return self.play_dev_card_bot(player, 'road_building', road_pair = road_pair)
+        if kind == BANK_TRADE:
+            return self.trade_with_bank(player, RESOURCES[a], RESOURCES[b])
+        return False, 'unknown action'
 
 
     #POTENTIAL PLAYER ACTIONS
@@ -41,28 +210,22 @@ class Game:
         if not node or not node.is_empty():
            
             return False, 'cannot build here (already built in)'
-        if not self.setup_phase and not self.has_required_resources(player, COSTS_CARD['settlement']):
+        if not self.setup_phase and not self.can_afford(player, 'settlement'):
             #print(f"[BUILD FAIL] Player {player.id} lacks resources for settlement.")
             return False, 'not enough resources'
-        for neighbor_id in node.connected_nodes:
-            neighbor = self.board.nodes[neighbor_id]
-            if neighbor.owner is not None:
-                #print(f"[BUILD FAIL] Node {node_id} is too close to another building.")
-                return False, 'cannot build here (too close)'
+        if not self.board.can_settle(node_id):
+            #print(f"[BUILD FAIL] Node {node_id} is too close to another building.")
+            return False, 'cannot build here (too close)'
         if not self.setup_phase:
-            connected = False
-            for road in player.roads:
-                if node_id in road:
-                    connected = True
-                    break
-            if not connected:
+            if not player.network.has(node_id):
                 #print(f"[BUILD FAIL] Node {node_id} not connected by road.")
                 return False, 'settlement must be connected to a road'
 
-        self.spend_resources(player, COSTS_CARD['settlement'])
-        node.owner = player.id
-        node.building_type = 'settlement'
+        player.resources.pay(COSTS['settlement'])
+        self.board.place_settlement(node_id, player.id)
         player.settlements.add(node_id)
+        player.network.add_building(node_id)
+        player.add_port(node.port)
         player.points += 1
         #print(f"[BUILD SUCCESS] Player {player.id} built settlement at {node_id}")
         return True, 'settlement built'
@@ -75,11 +238,11 @@ class Game:
             return False, 'cannot build here (no settlement)'
         if node.owner != player.id:
             return False, 'not your settlement'
-        if not self.has_required_resources(player, COSTS_CARD['city']):
+        if not self.can_afford(player, 'city'):
             return False, 'not enough resources'
         
-        self.spend_resources(player, COSTS_CARD['city'])
-        node.building_type = 'city'
+        player.resources.pay(COSTS['city'])
+        self.board.place_city(node_id)
         
         player.cities.add(node_id)
         player.settlements.remove(node_id)
@@ -95,24 +258,19 @@ class Game:
         if edge.owner is not None:
             return False, 'road already built'
 
-        # collect all nodes in the player's existing network
-        network_nodes = set(player.settlements) | set(player.cities)
-        for r in player.roads:
-            # each r is a tuple like ('node_12','node_13')
-            network_nodes |= set(r)
-
         # must attach at least one end of the new road to the network
-        if node1_id not in network_nodes and node2_id not in network_nodes:
-            #print(f"[DEBUG] Neither {node1_id} nor {node2_id} is in network {network_nodes}")
+        if not player.network.has(node1_id) and not player.network.has(node2_id):
+            #print(f"[DEBUG] Neither {node1_id} nor {node2_id} is in network")
             return False, 'road must connect to your existing network'
 
         if not free:
-            if not self.has_required_resources(player, COSTS_CARD['road']):
+            if not self.can_afford(player, 'road'):
                 return False, 'not enough resources'
-            self.spend_resources(player, COSTS_CARD['road'])
+            player.resources.pay(COSTS['road'])
 
-        edge.owner = player.id
+        self.board.place_road(edge, player.id)
         player.roads.add(tuple(sorted((node1_id, node2_id))))
+        player.network.add_road(node1_id, node2_id)
         self.check_longest_road()
         #print(f"[DEBUG] Player {player.id} built road from {node1_id} to {node2_id}")
         return True, 'road built'
@@ -121,10 +279,10 @@ class Game:
     def buy_dev_card(self, player):
         if not self.dev_deck:
             return False, 'no development cards left'
-        if not self.has_required_resources(player, COSTS_CARD['dev_card']):
+        if not self.can_afford(player, 'dev_card'):
             return False, 'not enough resources'
         
-        self.spend_resources(player, COSTS_CARD['dev_card'])
+        player.resources.pay(COSTS['dev_card'])
         card = self.dev_deck.pop()
         if card == 'victory_point':
             player.points += 1
@@ -268,24 +426,8 @@ class Game:
             return False, 'invalid resource'
         if give == get:
             return False, 'cannot trade for same resource'
-        rate = 4
-        
-        has_3to1 = False
-        for node_id in player.settlements.union(player.cities):
-            if self.board.nodes[node_id].port == '3:1':
-                has_3to1 = True
-                break
-        if has_3to1:
-            rate = 3
-        specific_port = f'2:1_{give}'
-        has_2to1 = False
-        for node_id in player.settlements.union(player.cities):
-            if self.board.nodes[node_id].port == specific_port:
-                has_2to1 = True
-                break
-        if has_2to1:
-            rate = 2
-        
+        rate = self.trade_rate(player, give)
+
         if player.resources[give] < rate:
             return False, f'not engouh {give} (need {rate}) to trade'
         
@@ -294,6 +436,10 @@ class Game:
 
         return True, f'traded {rate} {give} for 1 {get}'
 
+    def trade_rate(self, player, give):
+        #4:1 with the bank, 3 with any 3:1 port, 2 with the 2:1 port for `give` (kept in player.trade_rates)
+        return player.trade_rates[give]
+
     def propose_trade(self, proposer, reciever, offer: dict, request: dict):
         for res, amt in offer.items():
             if proposer.resources.get(res, 0) < amt:
@@ -323,73 +469,12 @@ class Game:
 
 
     #HELPER FUNCTIONS
-    #Basically I suspect the bottom one is some ass so I'm putting this one in, unclear if it's like that
+    #longest road comes from the incremental engine (longest_road.py), it follows the board's road/settlement masks
     def find_longest_road(self, player):
-        board = self.board
-        player_edges = set()
-
-        # Collect all edges owned by the player
-        for edge in board.edges:
-            if edge.owner == player.id:
-                player_edges.add((edge.node1.id, edge.node2.id))
-
-        longest_path = []
-        max_length = 0
-
-        # DFS helper to explore paths
-        def dfs(current, visited_edges, path):
-            nonlocal longest_path, max_length
-
-            if len(path) > max_length:
-                max_length = len(path)
-                longest_path = path[:]
-
-            for neighbor in board.nodes[current].connected_nodes:
-                edge = tuple(sorted((current, neighbor)))
-                if edge in player_edges and edge not in visited_edges:
-                    # Stop at enemy settlements
-                    if board.nodes[neighbor].owner not in (None, player.id):
-                        continue
-
-                    visited_edges.add(edge)
-                    path.append(neighbor)
-                    dfs(neighbor, visited_edges, path)
-                    path.pop()
-                    visited_edges.remove(edge)
-
-        # Try DFS starting from every node connected to a road
-        nodes_in_roads = set()
-        for edge in player_edges:
-            nodes_in_roads.update(edge)
-
-        for node in nodes_in_roads:
-            dfs(node, set(), [node])
-
-        return longest_path, max_length
+        return self.longest_roads.longest(player.id)
 
-    #DFS ALGORITHM
     def get_longest_road_length(self, player):
-        max_length = 0
-
-        def dfs(node_id, length, visited):
-            nonlocal max_length
-            max_length = max(max_length, length)
-
-            for neighbor_id in self.board.nodes[node_id].connected_nodes:
-                edge = tuple(sorted((node_id, neighbor_id)))
-                if edge in player.roads and edge not in visited:
-                    visited.add(edge)
-                    dfs(neighbor_id, length + 1, visited)
-                    visited.remove(edge)
-
-        all_nodes = set()
-        for road in player.roads:
-            all_nodes.update(road)
-
-        for start_node in all_nodes:
-            dfs(start_node, 0, set())
-        
-        return max_length
+        return self.longest_roads.length(player.id)
 
     def check_longest_road(self):
         #  ── Debug snapshot ──
@@ -506,9 +591,7 @@ class Game:
             return False, 'please insert a number'
         if hex_index < 0 or hex_index >= len(self.board.hexes):
                 return False, 'invalid tile index'
-        for hex in self.board.hexes:
-            hex.robber = False
-        self.board.hexes[hex_index].robber = True
+        self.board.move_robber(hex_index)
         #print(f'robber now on tile {hex_index}: {self.board.hexes[hex_index]}')
         
         hex_tile = self.board.hexes[hex_index]
@@ -549,12 +632,8 @@ class Game:
         if hex_index < 0 or hex_index >= len(self.board.hexes):
             return False, 'Invalid tile index'
 
-        # Remove the robber from all tiles
-        for hex in self.board.hexes:
-            hex.robber = False
-
-        # Set robber on the new tile
-        self.board.hexes[hex_index].robber = True
+        # Move the robber (also refreshes the payout table)
+        self.board.move_robber(hex_index)
         #print(f'Robber now on tile {hex_index}: {self.board.hexes[hex_index]}')
 
         hex_tile = self.board.hexes[hex_index]
@@ -587,18 +666,21 @@ class Game:
         #print(f'Stole 1 {stolen} from Player {target_id}')
         return True, f'Robber moved and stole 1 {stolen} from Player {target_id}'
     
+    def can_afford(self, player, build):
+        return player.resources.covers(COSTS[build])
+
+    def buildable_types(self, player):
+        #every build type the hand pays for (settlement / city / road / dev_card), one packed check
+        return affordable(player.resources.packed)
+
     def has_required_resources(self, player, cost_dict):
-        return all(player.resources.get(res,0) >= amt for res, amt in cost_dict.items())
+        return player.resources.covers(pack(cost_dict))
     
     def spend_resources(self, player, cost_dict):
-        for res, amt in cost_dict.items():
-            player.resources[res] -= amt
+        player.resources.pay(pack(cost_dict))
 
     def find_edge(self, node1_id, node2_id):
-        for edge in self.board.edges:
-            if {edge.node1.id, edge.node2.id} == {node1_id, node2_id}:
-                return edge
-        return None
+        return self.board.get_edge(node1_id, node2_id)
 
     def are_nodes_connected(self, node_id, road_tuple):
         return node_id in road_tuple
@@ -630,16 +712,10 @@ class Game:
         return d1 + d2
     
     def distribute_resources(self, roll):
-        for hex in self.board.hexes:
-            if hex.dice_number != roll or hex.robber:
-                continue
-
-            for node_id in hex.node_ids:
-                node = self.board.nodes[node_id]
-                if node.owner is not None:
-                    player = self.players[node.owner]
-                    amount = 2 if node.building_type == 'city' else 1
-                    player.resources[hex.resource] += amount
+        #board.payouts is kept up to date by every build and robber move
+        players = self.players
+        for player_id, resource, amount in self.board.payouts.get(roll, ()):
+            players[player_id].resources[resource] += amount
 
 
     def create_dev_deck(self, dev_deck):
@@ -654,20 +730,8 @@ class Game:
           - 3 if player has any 3:1 port
           - None if neither (caller should treat that as 4)
         """
-        # 1) First look for a specific 2:1 port
-        for nid in player.settlements | player.cities:
-            port = self.board.nodes[nid].port  # e.g. "2:wood", "3:1", or None
-            if port and port.startswith(f"2:{resource}"):
-                return 2
-
-        # 2) Then look for any 3:1 port
-        for nid in player.settlements | player.cities:
-            port = self.board.nodes[nid].port
-            if port == "3:1":
-                return 3
-
-        # 3) No special port—caller will use 4:1
-        return None
+        rate = player.trade_rates[resource]
+        return rate if rate < 4 else None
 
     def start_placement_rounds(self):
         for player in self.players:
@@ -686,11 +750,13 @@ class Game:
         if not edge or edge.owner is not None:
             return False, 'invalid road location'
         
-        node.owner = player.id
-        node.building_type = 'settlement'
-        edge.owner = player.id
+        self.board.place_settlement(node_id, player.id)
+        self.board.place_road(edge, player.id)
         player.settlements.add(node_id)
         player.roads.add(tuple(sorted((node_id, road_target_id))))
+        player.network.add_building(node_id)
+        player.network.add_road(node_id, road_target_id)
+        player.add_port(node.port)
         player.points += 1
         return True, 'first settle placed'
     
@@ -709,44 +775,14 @@ class Game:
         self.current_player_turn = (self.current_player_turn + 1) % len(self.players)
 
     def get_edge(self, node1_id, node2_id):
-        node_pair = tuple(sorted((node1_id, node2_id)))
-        for edge in self.board.edges:
-            if {edge.node1.id, edge.node2.id} == set(node_pair):
-                return edge
-        return None
+        return self.board.get_edge(node1_id, node2_id)
 
     def find_available_nodes(self):
-        available = []
-        for node_id, node in self.board.nodes.items():
-            if node.owner is not None:
-                continue
-
-            neighbors = self.board.nodes[node_id].connected_nodes
-            if any(self.board.nodes[n_id].owner is not None for n_id in neighbors):
-                continue
-
-            available.append(node_id)
-
-        return available
+        return self.board.mask_to_nodes(self.board.open_mask())
     
     def valid_node(self, node_id, player_id=None):
         """Returns True if the node is a valid place to build a settlement (unoccupied, and all neighbors are unoccupied)."""
-        if node_id not in self.board.nodes:
-            return False
-
-        node = self.board.nodes[node_id]
-        
-        # Node must be empty
-        if node.owner is not None:
-            return False
-
-        # All neighboring nodes must also be unoccupied
-        for neighbor_id in node.connected_nodes:
-            neighbor = self.board.nodes[neighbor_id]
-            if neighbor.owner is not None:
-                return False
-
-        return True
+        return self.board.can_settle(node_id)
     
     def distance_between_nodes(self, start_id, target_id, player_id=None):
 
@@ -762,8 +798,7 @@ class Game:
             visited.add(current)
 
             for neighbor in self.board.nodes[current].connected_nodes:
-                edge = tuple(sorted((current, neighbor)))
-                edge_obj = next((e for e in self.board.edges if {e.node1.id, e.node2.id} == set(edge)), None)
+                edge_obj = self.board.get_edge(current, neighbor)
 
                 if edge_obj is None:
                     continue
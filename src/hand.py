@@ -0,0 +1,119 @@
+from collections.abc import MutableMapping
+from constants import COSTS_CARD
+
+'''
+Resource hands as one packed int: 5 slots of LANE bits, slot i = count of HAND_RESOURCES[i],
+the same bitboard idea the board masks use. The top bit of every slot is a guard that stays
+clear in a hand, so one subtraction compares all five counts at once:
+    (hand | GUARDS) - cost   keeps a slot's guard bit set exactly where hand >= cost.
+Costs are packed the same way (COSTS), and the four build costs sit side by side in
+COST_MATRIX so affordable() checks every build type with one subtraction too.
+
+Counts must stay in 0..MAX_COUNT (Hand raises ValueError otherwise), a negative count would
+borrow from the slot above it.
+'''
+
+HAND_RESOURCES = ('wood', 'ore', 'sheep', 'brick', 'wheat') #the order Player.resources always iterated in
+SLOT = {res: i for i, res in enumerate(HAND_RESOURCES)}
+LANE = 16
+MAX_COUNT = (1 << (LANE - 1)) - 1
+SHIFTS = tuple(LANE * i for i in range(len(HAND_RESOURCES)))
+SHIFT = {res: SHIFTS[i] for res, i in SLOT.items()}
+ONES = sum(1 << s for s in SHIFTS)
+GUARDS = ONES << (LANE - 1)
+HAND_BITS = LANE * len(HAND_RESOURCES)
+
+
+def pack(counts):
+    '''Packed hand from a {resource: count} dict (missing resources are 0).'''
+    packed = 0
+    for res, count in counts.items():
+        if not 0 <= count <= MAX_COUNT:
+            raise ValueError(f'{res} count {count} out of range')
+        packed |= count << SHIFT[res]
+    return packed
+
+
+def unit(res, count=1):
+    return count << SHIFT[res]
+
+
+def count(packed, res):
+    return packed >> SHIFT[res] & MAX_COUNT
+
+
+def covers(packed, cost):
+    return ((packed | GUARDS) - cost) & GUARDS == GUARDS
+
+
+def deficit(packed, cost):
+    '''Per slot max(cost - hand, 0), still packed.'''
+    diff = (cost | GUARDS) - packed
+    keep = diff & GUARDS
+    return diff & (keep - (keep >> (LANE - 1)))
+
+
+def total(packed):
+    #all slots summed by one multiply (exact while the total stays under 2**LANE)
+    return (packed * ONES) >> (HAND_BITS - LANE) & ((1 << LANE) - 1)
+
+
+BUILD_TYPES = tuple(COSTS_CARD) #settlement, city, road, dev_card
+COSTS = {build: pack(cost) for build, cost in COSTS_CARD.items()}
+COST_MATRIX = sum(COSTS[build] << (HAND_BITS * row) for row, build in enumerate(BUILD_TYPES))
+ROW_REPEAT = sum(1 << (HAND_BITS * row) for row in range(len(BUILD_TYPES)))
+ROW_GUARDS = GUARDS * ROW_REPEAT
+
+
+def affordable(packed):
+    '''The build types the hand can pay for, in BUILD_TYPES order.'''
+    ok = ((packed * ROW_REPEAT | ROW_GUARDS) - COST_MATRIX) & ROW_GUARDS
+    return [build for row, build in enumerate(BUILD_TYPES) if ok >> (HAND_BITS * row) & GUARDS == GUARDS]
+
+
+class Hand(MutableMapping):
+    '''Dict view over a packed hand, so player.resources['wood'] += 1 etc. keep working.'''
+    __slots__ = ('packed',)
+
+    def __init__(self, counts=None):
+        self.packed = pack(counts) if counts else 0
+
+    def __getitem__(self, res):
+        return self.packed >> SHIFT[res] & MAX_COUNT
+
+    def __setitem__(self, res, value):
+        if not 0 <= value <= MAX_COUNT:
+            raise ValueError(f'{res} count {value} out of range')
+        shift = SHIFT[res]
+        self.packed += (value - (self.packed >> shift & MAX_COUNT)) << shift
+
+    def __delitem__(self, res):
+        raise TypeError('a hand always holds all five resources')
+
+    def __iter__(self):
+        return iter(HAND_RESOURCES)
+
+    def __len__(self):
+        return len(HAND_RESOURCES)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        hand = Hand()
+        hand.packed = self.packed
+        return hand
+
+    def covers(self, cost):
+        return covers(self.packed, cost)
+
+    def deficit(self, cost):
+        return deficit(self.packed, cost)
+
+    def total(self):
+        return total(self.packed)
+
+    def pay(self, cost):
+        if not covers(self.packed, cost):
+            raise ValueError('hand cannot cover that cost')
+        self.packed -= cost
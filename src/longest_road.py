@@ -0,0 +1,200 @@
+'''
+Longest road for every player, kept up to date incrementally.
+
+Each player's roads are split into connected components (two roads connect through a node
+unless another player has built on it). A component's length is its longest trail: no road
+used twice and never passing through another player's settlement or city (a road may still
+end at one). LongestRoads follows board.road_masks / board.owner_masks: a new road only
+re-walks the component it joins, a new settlement only re-walks the components it cuts, and
+anything going backwards (board.restore to an earlier state) rebuilds from scratch.
+'''
+
+
+def trail(topology, edges, blocked):
+    '''(length, node path) of the longest trail over the edge mask `edges`, not passing through `blocked` nodes.'''
+    ends, node_edges = topology.edge_ends, topology.node_edges
+    best = [0, []]
+    path = []
+
+    def walk(u, used, length):
+        path.append(u)
+        if length > best[0]:
+            best[0], best[1] = length, path[:]
+        if not (length and blocked >> u & 1):
+            for e in node_edges[u]:
+                bit = 1 << e
+                if edges & bit and not used & bit:
+                    a, b = ends[e]
+                    walk(b if a == u else a, used | bit, length + 1)
+        path.pop()
+
+    for u in topology.mask_to_ids(edge_nodes(topology, edges)):
+        walk(u, 0, 0)
+    return best[0], best[1]
+
+
+def edge_nodes(topology, edges):
+    mask = 0
+    for e in topology.mask_to_ids(edges):
+        a, b = topology.edge_ends[e]
+        mask |= (1 << a) | (1 << b)
+    return mask
+
+
+def split(topology, edges, blocked):
+    '''Connected pieces of the edge mask, connecting only through nodes not in `blocked`.'''
+    ends, node_edges = topology.edge_ends, topology.node_edges
+    pieces = []
+    while edges:
+        piece = edges & -edges
+        frontier = [piece.bit_length() - 1]
+        while frontier:
+            for u in ends[frontier.pop()]:
+                if blocked >> u & 1:
+                    continue
+                for e in node_edges[u]:
+                    bit = 1 << e
+                    if edges & bit and not piece & bit:
+                        piece |= bit
+                        frontier.append(e)
+        pieces.append(piece)
+        edges &= ~piece
+    return pieces
+
+
+class Component:
+    __slots__ = ('edges', 'nodes', 'length', 'path')
+
+    def __init__(self, topology, edges, blocked):
+        self.edges = edges
+        self.nodes = edge_nodes(topology, edges)
+        self.length, self.path = trail(topology, edges, blocked)
+
+
+class LongestRoads:
+    def __init__(self, board):
+        self.board = board
+        self.topology = board.topology
+        self.rebuild()
+
+    def rebuild(self):
+        self.components = {} #player id -> [Component]
+        self.seen_roads = {}
+        self.seen_owners = {}
+        self.sync()
+
+    def blocked_for(self, player_id):
+        board = self.board
+        return board.occupied_mask & ~board.owner_masks.get(player_id, 0)
+
+    def sync(self):
+        board = self.board
+        roads, owners = board.road_masks, board.owner_masks
+        if any(mask & ~roads.get(p, 0) for p, mask in self.seen_roads.items()) or \
+                any(mask & ~owners.get(p, 0) for p, mask in self.seen_owners.items()):
+            self.components, self.seen_roads, self.seen_owners = {}, {}, {}
+
+        for owner, mask in owners.items():
+            new = mask & ~self.seen_owners.get(owner, 0)
+            if new:
+                self.seen_owners[owner] = mask
+                for player_id in self.components:
+                    if player_id != owner:
+                        self.cut(player_id, new)
+
+        for player_id, mask in roads.items():
+            new = mask & ~self.seen_roads.get(player_id, 0)
+            if new:
+                self.seen_roads[player_id] = mask
+                for e in self.topology.mask_to_ids(new):
+                    self.add_road(player_id, e)
+
+    def add_road(self, player_id, e):
+        #the new road joins every component touching one of its ends that isn't blocked
+        blocked = self.blocked_for(player_id)
+        a, b = self.topology.edge_ends[e]
+        joinable = ((1 << a) | (1 << b)) & ~blocked
+        components = self.components.setdefault(player_id, [])
+        touching = [c for c in components if c.nodes & joinable]
+        edges = 1 << e
+        for c in touching:
+            edges |= c.edges
+            components.remove(c)
+        components.append(Component(self.topology, edges, blocked))
+
+    def cut(self, player_id, new_nodes):
+        #someone else built on new_nodes: components running through them may fall apart
+        blocked = self.blocked_for(player_id)
+        components = self.components[player_id]
+        for c in [c for c in components if c.nodes & new_nodes]:
+            components.remove(c)
+            components += [Component(self.topology, piece, blocked) for piece in split(self.topology, c.edges, blocked)]
+
+    def best(self, player_id):
+        self.sync()
+        return max(self.components.get(player_id, ()), key=lambda c: c.length, default=None)
+
+    def length(self, player_id):
+        best = self.best(player_id)
+        return best.length if best else 0
+
+    def longest(self, player_id):
+        '''(node ids along the longest road, its length).'''
+        best = self.best(player_id)
+        if best is None:
+            return [], 0
+        names = self.topology.node_names
+        return [names[u] for u in best.path], best.length
+
+
+def reference_length(board, player_id):
+    #plain DFS over the player's roads with the same blocking rule, for checking the engine
+    roads = {(edge.node1.id, edge.node2.id) for edge in board.edges if edge.owner == player_id}
+    roads |= {(b, a) for a, b in roads}
+    best = 0
+
+    def dfs(node_id, used, length):
+        nonlocal best
+        best = max(best, length)
+        owner = board.nodes[node_id].owner
+        if length and owner is not None and owner != player_id:
+            return
+        for neighbor in board.nodes[node_id].connected_nodes:
+            road = tuple(sorted((node_id, neighbor)))
+            if (node_id, neighbor) in roads and road not in used:
+                dfs(neighbor, used | {road}, length + 1)
+
+    for node_id in {a for a, _ in roads}:
+        dfs(node_id, frozenset(), 0)
+    return best
+
+
+if __name__ == '__main__':
+    #randomized check against reference_length: random roads and settlements, snapshots restored
+    import random
+    from board import Board
+
+    rng = random.Random(0)
+    checked = 0
+    for game_number in range(200):
+        board = Board()
+        engine = LongestRoads(board)
+        snapshots = []
+        for step in range(rng.randrange(10, 60)):
+            if rng.random() < 0.75:
+                free = [edge for edge in board.edges if edge.owner is None]
+                board.place_road(rng.choice(free), rng.randrange(4))
+            else:
+                free = [node_id for node_id, node in board.nodes.items() if node.owner is None]
+                board.place_settlement(rng.choice(free), rng.randrange(4))
+            if rng.random() < 0.1:
+                snapshots.append(board.snapshot())
+            if snapshots and rng.random() < 0.05:
+                board.restore(rng.choice(snapshots))
+            for player_id in range(4):
+                expected = reference_length(board, player_id)
+                assert engine.length(player_id) == expected, (game_number, step, player_id, expected)
+                path, length = engine.longest(player_id)
+                assert len(path) == (length + 1 if length else 0)
+                checked += 1
+    print(f'longest road engine agrees with the reference on {checked} checks')
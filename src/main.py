@@ -4,10 +4,10 @@ from bot import Bot
 from collections import Counter
 import constants
 import random
-import pandas as pd
-import optuna
 import bot
 
+#pandas/optuna are only imported inside the functions that need them, so importing this module is cheap
+
 #TODOS:
 '''
 - fix the 2nd settle road placement logic
@@ -32,26 +32,33 @@ TRIALS = 5000 #for optuna testing and normal testing
 NUM_OPTUNA_TRIALS = 50 #number of tested weights
 
 #Simulation Logic
-def simulate_one(seed=None, max_turns=200):
-    if seed is not None:
-        random.seed(seed)
-    
-    #setup
-    board = Board(test_hexes = constants.TEST_BOARD)
-    game = Game(board, 4)
-    bots = [Bot(player_id = i, total_players=4) for i in range(4)]
-
-    for i, player in enumerate(game.players):
-        player.bot = bots[i]
-
+def place_with_road(game, bot, node):
+    #settlement + the bot's road, or the first neighbour that takes a road if the bot has none; returns the road target placed
+    board = game.board
+    player = game.players[bot.player_id]
+    target = bot.choose_road_after_settlement(board, node, bot.player_id)
+    success, msg = game.place_initial_settle_and_road(player, node, target)
+    if success:
+        return target
+    for nb in board.nodes[node].connected_nodes:
+        ok, msg2 = game.place_initial_settle_and_road(player, node, nb)
+        if ok:
+            return nb
+    return None
+
+
+def run_draft(game, bots, smart_id):
+    #returns the picks as (player_id, node, road target) in pick order, the format board_io.encode_setup takes
+    #(road target = the road actually placed, falling back to any free neighbour when the bot picks none)
+    board = game.board
     first_placements = []
     second_placements = []
     taken_nodes = set()
-    smart_settlement_indicator = random.randint(0,3) #randomly choose smart bot
+    picks = []
 
     # First placements
     for bot in bots:
-        if bot.player_id == smart_settlement_indicator:
+        if bot.player_id == smart_id:
             node = bot.choose_first_placement(board, taken_nodes)
         else: 
             node = game.pick_random_settle(taken_nodes)
@@ -59,12 +66,12 @@ def simulate_one(seed=None, max_turns=200):
         taken_nodes.update(board.nodes[node].connected_nodes)
         first_placements.append((bot.player_id, node))
 
-        neighbor = bot.choose_road_after_settlement(board, node, bot.player_id)
-        game.place_initial_settle_and_road(game.players[bot.player_id], node, neighbor)
+        neighbor = place_with_road(game, bot, node)
+        picks.append((bot.player_id, node, neighbor))
 
     # Second placements
     for bot in reversed(bots):
-        if bot.player_id == smart_settlement_indicator:
+        if bot.player_id == smart_id:
             node2 = bot.choose_second_placement(board, first_placements[bot.player_id][1], taken_nodes)
         else: 
             node2 = game.pick_random_settle(taken_nodes)
@@ -75,22 +82,67 @@ def simulate_one(seed=None, max_turns=200):
     
     for bot_id, node2 in second_placements:
         bot = bots[bot_id]
-        road2 = bot.choose_road_after_settlement(board, node2, bot_id)
-        success, msg = game.place_initial_settle_and_road(game.players[bot_id], node2, road2)
+        road2 = place_with_road(game, bot, node2)
+        game.distribute_starting_resources(game.players[bot_id])
+        picks.append((bot_id, node2, road2))
 
-        if not success:
-            for nb in board.nodes[node2].connected_nodes:
-                ok, msg2 = game.place_initial_settle_and_road(game.players[bot_id], node2, nb)
-                if ok:
-                    break
+    return picks
+
+
+def replay_setup(game, picks):
+    #recorded placements (run_draft / board_io.decode_setup format), starting resources on the second round
+    num_players = len(game.players)
+    for k, (player_id, node_id, target_id) in enumerate(picks):
+        player = game.players[player_id]
+        game.place_initial_settle_and_road(player, node_id, target_id)
+        if k >= num_players:
+            game.distribute_starting_resources(player)
 
-        game.distribute_starting_resources(game.players[bot_id])
 
+def simulate_one(seed=None, max_turns=200, board=None, placement_cache=None, setup=None, opening_book=None, rollout_placer=None):
+    if seed is not None:
+        random.seed(seed)
+    
+    #setup (pass a fresh board, e.g. from board_batch.generate_boards, to play something other than TEST_BOARD)
+    if board is None:
+        board = Board(test_hexes = constants.TEST_BOARD)
+    game = Game(board, 4)
+    bots = [
+        Bot(player_id = i, total_players=4, placement_cache=placement_cache, opening_book=opening_book, rollout_placer=rollout_placer)
+        for i in range(4)
+    ]
+
+    for i, player in enumerate(game.players):
+        player.bot = bots[i]
+
+    smart_settlement_indicator = random.randint(0,3) #randomly choose smart bot
+
+    #initial placements: either replay a recorded setup (board_io.decode_setup picks) or run the draft
+    if setup is not None:
+        replay_setup(game, setup)
+    else:
+        run_draft(game, bots, smart_settlement_indicator)
+
+    play_game(game, max_turns)
+
+    # Game over
+    winner = game.check_win()
+    return {
+        "winner": winner.id if winner else None,
+        "turns": game.turn,
+        "largest_army": game.largest_army_player_id,
+        "longest_road": game.longest_road_player_id,
+        **{f"points_{p.id}": p.points for p in game.players},
+        'smart': smart_settlement_indicator
+    }
+
+
+def play_game(game, max_turns=200):
+    #the main game loop after the draft, players act through their .bot
     MAX_TURNS = max_turns
     game.setup_phase = False
     turn_count = 0
 
-    #game loop
     while not game.game_over() and turn_count < MAX_TURNS:
         current_player = game.players[game.current_player_turn]
 
@@ -114,24 +166,19 @@ def simulate_one(seed=None, max_turns=200):
         turn_count += 1
         game.turn += 1
 
-    # Game over
-    winner = game.check_win()
-    return {
-        "winner": winner.id if winner else None,
-        "turns": game.turn,
-        "largest_army": game.largest_army_player_id,
-        "longest_road": game.longest_road_player_id,
-        **{f"points_{p.id}": p.points for p in game.players},
-        'smart': smart_settlement_indicator
-    }
 
 #to run trials and append results to a dataframe
-def run_trials(n):
+def run_trials(n, boards=None, placement_cache=None, opening_book=None, rollout_placer=None):
     results = []
     for i in range(n):
-        stats = simulate_one(seed=i)
+        board = boards[i % len(boards)] if boards is not None else None
+        stats = simulate_one(
+            seed=i, board=board, placement_cache=placement_cache, opening_book=opening_book, rollout_placer=rollout_placer
+        )
         stats["trial"] = i
         results.append(stats)
+
+    import pandas as pd
     return pd.DataFrame(results)
 
 
@@ -140,60 +187,65 @@ def run_trials(n):
 
 #OPTUNA for tuning
 
-'''
-def objective(trial):
-    # 1) Sample a candidate
-    orig = bot.SCORING_WEIGHTS.copy()
-    for name, (low, high) in tunable_weights.items():
-        bot.SCORING_WEIGHTS[name] = trial.suggest_float(name, low, high)
-
-    # 2) Run a simulation to estimate performance
-    df = run_trials(TRIALS)   # your simulate_one + run_trials
-    constants.SCORING_WEIGHTS = orig
-    smart_wins = (df["winner"] == df["smart"]).sum()
-    win_rate = smart_wins / len(df)
+def tune(n_trials=NUM_OPTUNA_TRIALS, trials=TRIALS):
+    import optuna
 
-    # 3) Return the metric to maximize
-    return win_rate
+    def objective(trial):
+        # 1) Sample a candidate
+        orig = bot.SCORING_WEIGHTS.copy()
+        for name, (low, high) in tunable_weights.items():
+            bot.SCORING_WEIGHTS[name] = trial.suggest_float(name, low, high)
 
-study = optuna.create_study(direction="maximize")
-study.optimize(objective, n_trials=NUM_OPTUNA_TRIALS) #number of differeint weights tested
+        # 2) Run a simulation to estimate performance
+        df = run_trials(trials)   # your simulate_one + run_trials
+        bot.SCORING_WEIGHTS.update(orig)
+        smart_wins = (df["winner"] == df["smart"]).sum()
+        win_rate = smart_wins / len(df)
 
-print("Best win rate:", study.best_value)
-print("Best weights:")
-for k, v in study.best_params.items():
-    print(f"  {k}: {v}")
-'''
+        # 3) Return the metric to maximize
+        return win_rate
+
+    study = optuna.create_study(direction="maximize")
+    study.optimize(objective, n_trials=n_trials) #number of differeint weights tested
+
+    print("Best win rate:", study.best_value)
+    print("Best weights:")
+    for k, v in study.best_params.items():
+        print(f"  {k}: {v}")
+    return study
 
 
 
 
 #normal test
 
+def report(df):
+    # Win rates:
+    print("Win rates:")
+    print(df["winner"].value_counts(normalize=True).sort_index())
 
-df = run_trials(TRIALS)
-#df.to_csv("catan_backtest.csv", index=False)
+    # Average game length:
+    print("\nAvg turns per game:", df["turns"].mean())
 
-# Win rates:
-print("Win rates:")
-print(df["winner"].value_counts(normalize=True).sort_index())
+    # How often each player held the special awards at game end:
+    print("\n% Largest Army holders:")
+    print(df["largest_army"].value_counts(normalize=True).sort_index())
 
-# Average game length:
-print("\nAvg turns per game:", df["turns"].mean())
+    print("\n% Longest Road holders:")
+    print(df["longest_road"].value_counts(normalize=True).sort_index())
 
-# How often each player held the special awards at game end:
-print("\n% Largest Army holders:")
-print(df["largest_army"].value_counts(normalize=True).sort_index())
+    smart_wins = (df["winner"] == df["smart"]).sum()
+    print(f"\nSmart-bot win rate: {smart_wins}/{len(df)} = {smart_wins/len(df):.2%}")
 
-print("\n% Longest Road holders:")
-print(df["longest_road"].value_counts(normalize=True).sort_index())
+    # Mean points by player:
+    mean_pts = {pid: df[f"points_{pid}"].mean() for pid in range(4)}
+    print("\nAvg final points:", mean_pts)
 
-smart_wins = (df["winner"] == df["smart"]).sum()
-print(f"\nSmart-bot win rate: {smart_wins}/{len(df)} = {smart_wins/len(df):.2%}")
 
-# Mean points by player:
-mean_pts = {pid: df[f"points_{pid}"].mean() for pid in range(4)}
-print("\nAvg final points:", mean_pts)
+if __name__ == '__main__':
+    df = run_trials(TRIALS)
+    #df.to_csv("catan_backtest.csv", index=False)
+    report(df)
 
 
 
@@ -345,7 +397,7 @@ def test_longest_road(game):
     for road in p0.roads:
         edge = game.find_edge(*road)
         if edge:
-            edge.owner = p0.id
+            game.board.place_road(edge, p0.id)
     game.check_longest_road()
     print(f"Player 0 points: {p0.points}")
 
@@ -0,0 +1,83 @@
+'''
+A player's building network, kept up to date as they build instead of being rebuilt from
+player.roads / settlements / cities on every query.
+
+  nodes     bit i = node i is one of the player's buildings or a road end (what build_road
+            and build_settlement call "connected")
+  reach     nodes + their neighbours, the nodes a settlement next to the network could go on
+  touching  bit e = edge e has an end in the network; touching & ~board.occupied_edges_mask
+            is the frontier of edges the player can build a road on
+  parent    union-find over network nodes, two nodes share a root when the player's roads join them
+
+Roads only get added, so the union-find never has to split; Player.restore rebuilds it all.
+'''
+
+
+class RoadNetwork:
+    def __init__(self, topology):
+        self.topology = topology
+        self.clear()
+
+    def clear(self):
+        self.nodes = 0
+        self.reach = 0
+        self.touching = 0
+        self.edges = 0 #the player's own roads
+        self.parent = {}
+
+    def rebuild(self, settlements, cities, roads):
+        self.clear()
+        for node_id in settlements | cities:
+            self.add_building(node_id)
+        for node1_id, node2_id in roads:
+            self.add_road(node1_id, node2_id)
+
+    def add_node(self, i):
+        if self.nodes >> i & 1:
+            return
+        self.nodes |= 1 << i
+        self.reach |= self.topology.closed_masks[i]
+        self.touching |= self.topology.node_edge_masks[i]
+        self.parent[i] = i
+
+    def add_building(self, node_id):
+        self.add_node(self.topology.node_index[node_id])
+
+    def add_road(self, node1_id, node2_id):
+        e = self.topology.edge_index_by_name[(node1_id, node2_id)]
+        a, b = self.topology.edge_ends[e]
+        self.edges |= 1 << e
+        self.add_node(a)
+        self.add_node(b)
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    #QUERIES, all by 'node_x' name like the rest of Game/Bot
+
+    def has(self, node_id):
+        return bool(self.nodes >> self.topology.node_index[node_id] & 1)
+
+    def connected(self, node1_id, node2_id):
+        '''True when the player's roads join the two nodes (both must be in the network).'''
+        index = self.topology.node_index
+        a, b = index[node1_id], index[node2_id]
+        return a in self.parent and b in self.parent and self.find(a) == self.find(b)
+
+    def frontier(self, board):
+        '''Edge mask of the empty edges with an end in the network (where build_road would accept a road).'''
+        return self.touching & ~board.occupied_edges_mask
+
+    def frontier_edges(self, board):
+        return [board.edges[e] for e in self.topology.mask_to_ids(self.frontier(board))]
+
+    def node_ids(self):
+        names = self.topology.node_names
+        return [names[i] for i in self.topology.mask_to_ids(self.nodes)]
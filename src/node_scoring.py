@@ -0,0 +1,116 @@
+import numpy as np
+import constants
+
+'''
+score_node for all 54 nodes at once.
+
+Every branch of Bot.score_node is "add (or subtract) one weight if some layout condition holds",
+so per board we build a node x term matrix of +1 / -1 / 0 flags (from the node x hex incidence
+and the BoardAnalysis tables) and scoring is then flags * weights summed along each row.
+The row sum is a running sum taken left to right in the same term order as score_node,
+which keeps every entry bit-for-bit equal to the scalar score.
+Rows follow board.topology.node_names.
+'''
+
+MAX_NODE_HEXES = 3
+RESOURCE_IDS = {res: k for k, res in enumerate(constants.RESOURCES)}
+
+#(weight key, corner bonus key, pip condition) per scarce tier
+SCARCE_TIERS = [
+    ('scarce_res_2pips', 'scarce_res_2pips+corner', lambda pips: pips == 2),
+    ('scarce_res_3pips', 'scarce_res_3pips+corner', lambda pips: pips == 3),
+    ('scarce_res>4pips', 'scarce_res>4pips_corner', lambda pips: pips >= 4),
+]
+
+#columns of the term matrix, in score_node order
+TERM_KEYS = ['single_pips>11', 'single_pips<=11>=9', 'single_pips<=7_penalty']
+for _ in range(MAX_NODE_HEXES):
+    TERM_KEYS.append('scarce_res_bonus')
+    for key, corner_key, _ in SCARCE_TIERS:
+        TERM_KEYS += [key, corner_key]
+TERM_KEYS += ['no_ports', '1_port', '2_ports', 'port_synergy', 'number_diversity', 'resource_synergy', 'ore_check', '3hexes']
+
+
+def node_terms(pips, slot_resource, slot_scarce, slot_pips, slot_corner,
+               num_ports, port_synergy, num_dice, res_synergy, ore_bonus, land_hexes):
+    '''
+    (..., nodes, len(TERM_KEYS)) flag matrix. Per node inputs are (..., nodes), per adjacent hex
+    inputs (..., nodes, MAX_NODE_HEXES) in BoardAnalysis.node_hexes order (by resource, best pips first)
+    with padding slots last and marked not scarce,
+    so a single board and a stacked batch of boards go through the same code.
+    '''
+    p = pips
+    columns = [p > 11, (p <= 11) & (p >= 9), np.where(p <= 7, -1.0, 0.0)]
+    for k in range(MAX_NODE_HEXES):
+        #scarce bonus only counts the first hex of each scarce resource on a node
+        first = slot_scarce[..., k].copy()
+        for j in range(k):
+            first &= slot_resource[..., k] != slot_resource[..., j]
+        columns.append(first)
+        for _, _, condition in SCARCE_TIERS:
+            hit = first & condition(slot_pips[..., k])
+            columns += [hit, hit & slot_corner[..., k]]
+    columns += [
+        np.where(num_ports == 0, -1.0, 0.0),
+        num_ports == 1,
+        num_ports == 2,
+        port_synergy,
+        num_dice == 3,
+        res_synergy,
+        ore_bonus,
+        land_hexes == 3,
+    ]
+    return np.stack([np.asarray(c, dtype=np.float64) for c in columns], axis=-1)
+
+
+def weigh_terms(terms, weights):
+    w = np.array([weights[key] for key in TERM_KEYS])
+    #accumulate (not sum): strictly left to right, so the rounding matches score_node
+    return np.add.accumulate(terms * w, axis=-1)[..., -1]
+
+
+class NodeFeatures:
+    def __init__(self, board):
+        analysis = board.analysis
+        topo = board.topology
+        num_hexes = len(board.hexes)
+        names = topo.node_names
+
+        self.incidence = np.zeros((topo.num_nodes, num_hexes), dtype=np.int64)
+        #adjacent hexes per node in analysis.node_hexes order, padded with a dummy hex (index num_hexes)
+        self.slots = np.full((topo.num_nodes, MAX_NODE_HEXES), num_hexes, dtype=np.int64)
+        for i, node_id in enumerate(names):
+            hexes = analysis.node_hexes[node_id]
+            self.incidence[i, list(hexes)] = 1
+            self.slots[i, :len(hexes)] = hexes
+
+        #per hex arrays, with the dummy hex on the end
+        hex_pips = np.array(analysis.hex_pips + [0], dtype=np.int64)
+        hex_corner = np.array(analysis.hex_corner + [False])
+        hex_resource = np.array([RESOURCE_IDS.get(res, -1) for res in analysis.hex_resources] + [-1])
+        hex_scarce = np.array([res != 'desert' and analysis.scarcity[res] == 'scarce' for res in analysis.hex_resources] + [False])
+
+        self.pips = self.incidence @ hex_pips[:num_hexes]
+        self.land_hexes = self.incidence @ (hex_resource[:num_hexes] >= 0).astype(np.int64)
+        wheat_scarce = analysis.scarcity['wheat'] == 'scarce'
+
+        self.terms = node_terms(
+            self.pips, hex_resource[self.slots], hex_scarce[self.slots], hex_pips[self.slots], hex_corner[self.slots],
+            np.array([len(analysis.node_ports[n]) for n in names]),
+            np.array([analysis.node_port_synergy[n] for n in names]),
+            np.array([len(analysis.node_dice[n]) for n in names]),
+            np.array([analysis.node_res_synergy[n] for n in names]),
+            np.array([analysis.node_has_ore[n] and not wheat_scarce for n in names]),
+            self.land_hexes,
+        )
+
+
+def node_features(board):
+    analysis = board.analysis
+    if analysis.features is None:
+        analysis.features = NodeFeatures(board)
+    return analysis.features
+
+
+def score_all_nodes(board, weights):
+    return weigh_terms(node_features(board).terms, weights)
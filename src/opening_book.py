@@ -0,0 +1,107 @@
+import json
+import os
+import random
+from symmetry import invert
+
+'''
+Opening book: placement answers computed offline and stored on disk as json.
+
+  {"version": 1, "weights": [...SCORING_WEIGHTS values...], "entries": {key: canonical node id}}
+
+Keys are placement_cache.placement_key without the weights, written out as
+"kind:canonical board hex:seat:taken mask hex:extra node ids", so rotated or mirrored copies
+of a board share entries. The whole book is tied to the scoring weights it was built with;
+if the weights change every lookup misses until the book is rebuilt.
+Build one with build_book (or `python src/cli.py book`).
+'''
+
+BOOK_VERSION = 1
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'opening_book.json')
+
+
+def entry_key(key):
+    kind, canonical, seat, taken_mask, extras, _ = key
+    return f"{kind}:{canonical.hex()}:{seat}:{taken_mask:x}:{'-'.join(map(str, extras))}"
+
+
+class OpeningBook:
+    '''
+    Lazily loaded: the file is only read on the first lookup. With learn=True every search
+    result passed to put() is added, which is how build_book fills it.
+    '''
+    def __init__(self, path=DEFAULT_BOOK_PATH, learn=False):
+        self.path = path
+        self.learn = learn
+        self.entries = None
+        self.weights = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        self.entries = {}
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('version') != BOOK_VERSION:
+            raise ValueError(f'{self.path} is opening book version {data.get("version")}, expected {BOOK_VERSION}')
+        self.weights = tuple(data['weights'])
+        self.entries = data['entries']
+
+    def __len__(self):
+        if self.entries is None:
+            self.load()
+        return len(self.entries)
+
+    def get(self, key, perm, board):
+        '''key, perm from placement_key (weights included); returns a node id on this board or None.'''
+        if self.entries is None:
+            self.load()
+        value = self.entries.get(entry_key(key)) if key[5] == self.weights else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return board.topology.node_names[invert(perm)[value]]
+
+    def put(self, key, perm, board, node_id):
+        if node_id is None:
+            return
+        if self.entries is None:
+            self.load()
+        if key[5] != self.weights:
+            #built with other weights, those answers are stale
+            self.entries = {}
+            self.weights = key[5]
+        self.entries[entry_key(key)] = perm[board.topology.node_index[node_id]]
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {'version': BOOK_VERSION, 'weights': list(self.weights or ()), 'entries': self.entries or {}}
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+
+def build_book(boards, path=DEFAULT_BOOK_PATH, samples=50, seed=0):
+    '''
+    Plays `samples` drafts per board and seat (random placers for the other seats, as in the
+    backtest) and records every smart bot placement. Entries already in the book are kept.
+    '''
+    from game import Game
+    from bot import Bot
+    from main import run_draft
+
+    book = OpeningBook(path, learn=True)
+    random.seed(seed)
+    for board in boards:
+        start = board.snapshot()
+        for seat in range(4):
+            for _ in range(samples):
+                board.restore(start)
+                game = Game(board, 4)
+                bots = [Bot(player_id = i, total_players = 4, opening_book = book) for i in range(4)]
+                run_draft(game, bots, seat)
+        board.restore(start)
+    book.save()
+    return book
@@ -0,0 +1,292 @@
+from functools import lru_cache
+import heapq
+import numpy as np
+import constants
+from strategies import STRATEGIES
+
+'''
+score_node(a) + score_node(b) + score_node_synergy(a, b) for every pair of nodes at once.
+
+Everything that only depends on the layout (pair pip totals, number diversity, dual port
+synergy, which strategy a pair falls into and its balance distances) is built once per board
+and kept on board.analysis. The two synergy terms that look at the occupied nodes (open
+settle spot left, settle spots reachable by road) are recomputed from the bitboards on each
+call. Terms are added in score_node_synergy's order so each entry equals the scalar total.
+The placement searches don't need every total: best_pairs walks pairs best first against
+cached upper bounds and row_totals scores one node's row.
+Rows and columns follow board.topology.node_names.
+'''
+
+OWS, OWS_HYBRID, ROAD, CITIES_ROADS, BALANCED, PORT, PRODUCTION = range(len(STRATEGIES))
+
+WOOD, BRICK, SHEEP, WHEAT, ORE = (constants.RESOURCES.index(res) for res in ('wood', 'brick', 'sheep', 'wheat', 'ore'))
+RESOURCE_BITS = 1 << np.arange(len(constants.RESOURCES))
+POPCOUNT = np.array([bin(i).count('1') for i in range(1 << 13)], dtype=np.int64)
+OWS_TARGET = [6 / 15, 6 / 15, 3 / 15] #normalized 6:6:3 ore:wheat:sheep
+
+
+@lru_cache(maxsize=None)
+def pair_order(topology):
+    '''(a, b) index arrays for combinations(sorted(node ids), 2), the order the first placement search walks.'''
+    index = topology.node_index
+    names = sorted(topology.node_names)
+    a, b = np.triu_indices(len(names), k=1)
+    order = np.array([index[name] for name in names])
+    return order[a], order[b]
+
+
+@lru_cache(maxsize=None)
+def mask_matrix(topology, radius):
+    '''bool (nodes, nodes): [i, j] = node j is within `radius` steps of node i.'''
+    n = topology.num_nodes
+    matrix = np.zeros((n, n), dtype=bool)
+    for i in range(n):
+        matrix[i, topology.mask_to_ids(topology.ball_mask(i, radius))] = True
+    return matrix
+
+
+def resource_bits(flags):
+    '''(..., resources) bools -> (...) ints with bit k set where flags[..., k].'''
+    return flags.astype(np.int64) @ RESOURCE_BITS
+
+
+@lru_cache(maxsize=None)
+def pair_positions(topology):
+    '''int (nodes, nodes): [a, b] = position of the pair in pair_order, either way round (diagonal unused).'''
+    a, b = pair_order(topology)
+    pos = np.zeros((topology.num_nodes, topology.num_nodes), dtype=np.int64)
+    pos[a, b] = pos[b, a] = np.arange(len(a))
+    return pos
+
+
+@lru_cache(maxsize=None)
+def empty_road_counts(topology):
+    '''road_spot_counts on a board with nothing built: nodes within 4 steps of a or b, minus a and b.'''
+    reach = mask_matrix(topology, 4)
+    return (reach[:, None, :] | reach[None, :, :]).sum(axis=-1) - 2
+
+
+def mask_to_bools(mask, size):
+    return np.array([(mask >> i) & 1 for i in range(size)], dtype=bool)
+
+
+class PairFeatures:
+    '''
+    Layout-only pair terms. Inputs may carry leading batch dimensions:
+    res_pips (..., nodes, nodes, resources) pips over the union of both nodes' hexes,
+    half_pips / numbers / port_bits (..., nodes, nodes), port_bits having bit k set for a 2:1 port of RESOURCES[k].
+    '''
+    def __init__(self, res_pips, half_pips, numbers, port_bits):
+        pips = self.res_pips = res_pips
+        self.half_pips = half_pips
+        self.numbers = numbers
+
+        self.port_synergy = port_bits & resource_bits(pips >= 4) != 0
+
+        #strategy each pair falls into, same precedence as strategies.classify
+        has = pips > 0
+        wood, brick, sheep, wheat, ore = pips[..., WOOD], pips[..., BRICK], pips[..., SHEEP], pips[..., WHEAT], pips[..., ORE]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wood_brick = wood / brick
+        conditions = [
+            ~has[..., WOOD] & ~has[..., BRICK],
+            (ore >= 3) & (wheat >= 3) & (has[..., WOOD] | has[..., BRICK]),
+            (wood >= 3) & (brick >= 3) & (ore == 0) & (sheep > 0) & (wheat > 0) & (wood_brick >= 0.66) & (wood_brick <= 1.5),
+            ~has[..., SHEEP],
+            has.all(axis=-1) & (wheat >= 3),
+            port_bits & resource_bits(pips >= 9) != 0,
+        ]
+        self.strategy = np.select(conditions, [OWS, OWS_HYBRID, ROAD, CITIES_ROADS, BALANCED, PORT], PRODUCTION)
+
+        #strategies.ows_pip_balance_score / city_and_roads_balance_score distances, before the weights
+        total = ore + wheat + sheep
+        distance = 0
+        for x, target in zip([ore, wheat, sheep], OWS_TARGET):
+            share = np.divide(x, total, out=np.zeros(total.shape), where=total > 0)
+            distance = distance + np.abs(share - target)
+        self.ows_distance = distance
+
+        cities, roads = ore + wheat, wood + brick
+        balanced = (cities > 0) & (roads > 0)
+        ratio = np.divide(cities, roads, out=np.ones(cities.shape), where=balanced)
+        self.cities_roads_distance = np.abs(ratio - 1)
+        self.cities_roads_balanced = balanced
+
+    def row(self, i):
+        '''The pairs (i, *) only, for a single board's features.'''
+        row = object.__new__(PairFeatures)
+        for name, value in vars(self).items():
+            setattr(row, name, value[i])
+        return row
+
+    @classmethod
+    def from_board(cls, board):
+        analysis = board.analysis
+        names = board.topology.node_names
+        n = len(names)
+
+        incidence = np.zeros((n, len(board.hexes)), dtype=bool)
+        for i, node_id in enumerate(names):
+            incidence[i, list(analysis.node_hexes[node_id])] = True
+        hex_res_pips = np.zeros((len(board.hexes), len(constants.RESOURCES)), dtype=np.int64)
+        for h, res in enumerate(analysis.hex_resources):
+            if res in constants.RESOURCES:
+                hex_res_pips[h, constants.RESOURCES.index(res)] = analysis.hex_pips[h]
+
+        #resource pips over the union of both nodes' hexes, shared hexes once (PairProfile.pips)
+        union = incidence[:, None, :] | incidence[None, :, :]
+        res_pips = union.astype(np.int64) @ hex_res_pips
+
+        node_pips = np.array([analysis.node_pips[name] for name in names])
+        dice_bits = np.array([sum(1 << d for d in analysis.node_dice[name]) for name in names])
+        port_bits = np.array([
+            sum(1 << k for k, res in enumerate(constants.RESOURCES) if f'2:1_{res}' in analysis.node_ports[name])
+            for name in names
+        ])
+        return cls(
+            res_pips,
+            (node_pips[:, None] + node_pips[None, :]) / 2,
+            POPCOUNT[dice_bits[:, None] | dice_bits[None, :]],
+            port_bits[:, None] | port_bits[None, :],
+        )
+
+
+def pair_features(board):
+    analysis = board.analysis
+    if analysis.pair_features is None:
+        analysis.pair_features = PairFeatures.from_board(board)
+    return analysis.pair_features
+
+
+def settle_spot_matrix(board):
+    '''[a, b] = check_settle_spot(board, {a, b}): some node is still settleable with a and b taken.'''
+    topo = board.topology
+    closed = mask_matrix(topo, 1)
+    open_ids = topo.mask_to_ids(board.open_mask())
+    free = (~closed[:, open_ids]).astype(np.int64)
+    return (free @ free.T) > 0
+
+
+def road_spot_counts(board, a, b):
+    '''len(find_accessible_settle_spots(board, [a, b])) for index arrays a, b.'''
+    topo = board.topology
+    reach = mask_matrix(topo, 4)
+    settleable = ~mask_to_bools(board.blocked_mask, topo.num_nodes)
+    spots = (reach[a] | reach[b]) & settleable
+    rows = np.arange(len(a))
+    spots[rows, a] = False
+    spots[rows, b] = False
+    return spots.sum(axis=1)
+
+
+def score_pairs(board, weights, node_scores):
+    '''
+    (totals, strategy): totals[a, b] is what the placement searches score the pair (a, b),
+    strategy[a, b] the index into STRATEGIES that strategies.classify picks for the pair.
+    node_scores is the score_node vector (node_scoring.score_all_nodes).
+    '''
+    f = pair_features(board)
+    road_counts = np.zeros(f.strategy.shape, dtype=np.int64)
+    a, b = np.nonzero(f.strategy == ROAD)
+    road_counts[a, b] = road_spot_counts(board, a, b)
+    node_sums = node_scores[:, None] + node_scores[None, :]
+    return pair_totals(f, weights, node_sums, settle_spot_matrix(board), road_counts), f.strategy
+
+
+def pair_totals(f, weights, node_sums, settle_spot, road_counts):
+    '''
+    The weighted sum for PairFeatures f (any leading batch dims), node_sums being score_node(a) + score_node(b)
+    in the same shape. settle_spot / road_counts are the occupancy dependent inputs
+    (settle_spot_matrix, road_spot_counts), only read where they apply.
+    '''
+    w = weights
+    strategy = f.strategy
+
+    synergy = np.zeros(f.half_pips.shape)
+    synergy += np.where(f.half_pips > 10.3, w['2spot_pips>10.3'], np.where(f.half_pips >= 9, w['2spot_pips<=10.3>=9'], 0.0))
+    synergy += np.where(f.numbers == 5, w['2spot_number_diversity=5'], 0.0)
+    synergy += np.where(f.numbers == 6, w['2spot_number_diversity=6'], 0.0)
+    synergy += np.where(f.port_synergy, w['2spot_port_synergy'], 0.0)
+
+    bonus = np.array([w[name] for name in STRATEGIES])
+    synergy += bonus[strategy]
+
+    #strategy extras, first and second in the order score_node_synergy adds them
+    settle_spot = np.where(settle_spot, w['2spot_settle_spot'], 0.0)
+    ows_balance = np.maximum(0, 1.5 - f.ows_distance * w['OWS_ratio_bonus_magnifier'])
+    cities_roads = np.where(
+        f.cities_roads_balanced, np.maximum(0, 1.5 - f.cities_roads_distance * w['CITIES&ROADS_balance_score']), 0.0
+    )
+    road = road_counts * w['ROAD_settle_spot_magnifier']
+
+    first = np.select(
+        [strategy == OWS, strategy == OWS_HYBRID, strategy == ROAD, strategy == CITIES_ROADS, strategy == BALANCED],
+        [ows_balance, settle_spot, road, cities_roads, settle_spot], 0.0
+    )
+    synergy += first
+    synergy += np.where(strategy == OWS, settle_spot, 0.0)
+
+    return node_sums + synergy
+
+
+def row_totals(board, weights, node_scores, a):
+    '''score_pairs(...)[0][a], scoring only the pairs (a, *).'''
+    f = pair_features(board).row(a)
+    topo = board.topology
+    n = topo.num_nodes
+    closed = mask_matrix(topo, 1)
+    free = ~closed[:, topo.mask_to_ids(board.open_mask())]
+    settle_spot = (free[a] & free).any(axis=1)
+    road_counts = np.zeros(n, dtype=np.int64)
+    b = np.nonzero(f.strategy == ROAD)[0]
+    road_counts[b] = road_spot_counts(board, np.full(len(b), a), b)
+    return pair_totals(f, weights, node_scores[a] + node_scores, settle_spot, road_counts)
+
+
+def bound_totals(board, weights, node_scores):
+    '''
+    Upper bounds on score_pairs totals whatever is built: the two occupancy terms are taken at
+    their best (a settle spot left if that scores, road spots counted as on an empty board), and
+    everything else is exact. Float sums are monotone, so every real total is <= its bound.
+    Cached per board and weights.
+    '''
+    analysis = board.analysis
+    fingerprint = tuple(weights.values())
+    if analysis.pair_bounds is None or analysis.pair_bounds[0] != fingerprint:
+        road_counts = empty_road_counts(board.topology) if weights['ROAD_settle_spot_magnifier'] >= 0 else 0
+        node_sums = node_scores[:, None] + node_scores[None, :]
+        bounds = pair_totals(pair_features(board), weights, node_sums, weights['2spot_settle_spot'] >= 0, road_counts)
+        analysis.pair_bounds = (fingerprint, bounds)
+    return analysis.pair_bounds[1]
+
+
+def best_pairs(board, weights, node_scores, taken):
+    '''
+    Pairs of open nodes as pair_order (a, b) index pairs, best total first with ties in pair_order
+    order, i.e. the same sequence as a stable sort of every score_pairs total, but lazily:
+    nodes are expanded in order of the best bound of any pair they are in, a row of real totals
+    is scored per expanded node, and a pair is only given out once it strictly beats every
+    unexpanded node's bound. The placement search usually stops after a pair or two, so only a
+    few rows get scored. taken: bool per node.
+    '''
+    topo = board.topology
+    order_a, order_b = pair_order(topo)
+    pos = pair_positions(topo)
+    open_nodes = ~taken
+    candidates = open_nodes[:, None] & open_nodes[None, :] & ~np.eye(topo.num_nodes, dtype=bool)
+    node_bounds = np.where(candidates, bound_totals(board, weights, node_scores), -np.inf).max(axis=1)
+
+    nodes = [(-bound, i) for i, bound in enumerate(node_bounds.tolist()) if bound > -np.inf]
+    heapq.heapify(nodes)
+    pairs = []
+    expanded = taken.copy()
+    while nodes or pairs:
+        if pairs and (not nodes or -pairs[0][0] > -nodes[0][0]):
+            _, p = heapq.heappop(pairs)
+            yield int(order_a[p]), int(order_b[p])
+            continue
+        _, a = heapq.heappop(nodes)
+        expanded[a] = True
+        totals, positions = row_totals(board, weights, node_scores, a).tolist(), pos[a].tolist()
+        for b in np.nonzero(~expanded)[0].tolist():
+            heapq.heappush(pairs, (-totals[b], positions[b]))
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from symmetry import canonical_board, invert
+
+
+def placement_key(board, kind, seat, taken_nodes, extra_nodes=(), weights=()):
+    '''
+    Returns (key, node_perm). `extra_nodes` are nodes the answer depends on besides the
+    taken set (e.g. the first settlement), `weights` should fingerprint the scoring weights.
+    Shared by PlacementCache and OpeningBook.
+    '''
+    canonical, perm = canonical_board(board)
+    index = board.topology.node_index
+    taken_mask = 0
+    for node_id in taken_nodes:
+        taken_mask |= 1 << perm[index[node_id]]
+    extras = tuple(perm[index[node_id]] for node_id in extra_nodes)
+    return (kind, canonical, seat, taken_mask, extras, weights), perm
+
+
+class PlacementCache:
+    '''
+    Bounded LRU of placement results. Keys are built on the symmetry-canonical board, so a
+    rotated or mirrored copy of a board we already solved is a hit. Nodes are stored as
+    canonical ids and mapped back onto the caller's board on the way out.
+    '''
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def make_key(self, board, kind, seat, taken_nodes, extra_nodes=(), weights=()):
+        return placement_key(board, kind, seat, taken_nodes, extra_nodes, weights)
+
+    def get(self, key, perm, board):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return board.topology.node_names[invert(perm)[value]]
+
+    def put(self, key, perm, board, node_id):
+        if node_id is None:
+            return
+        self.entries[key] = perm[board.topology.node_index[node_id]]
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
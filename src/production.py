@@ -0,0 +1,87 @@
+import numpy as np
+import constants
+
+'''
+Exact per turn production from the 36 dice outcomes.
+
+For every node, roll and resource we count the adjacent hexes paying out; a node's yield of a
+resource on one turn is then a random variable over the 36 outcomes, and everything is kept
+as integers out of 36 (means) or 36^2 (variances) so nothing depends on float rounding:
+  mean36[i, r]    = 36 * E[yield of resource r at node i]      (= the pip count, PIP_WEIGHTS are ways out of 36)
+  var1296[i, r]   = 36^2 * Var[yield of resource r at node i]
+Two nodes on the same roll pay out together, so pair / group variances include the covariance.
+Tables are per board and robber position (the robbed hex pays nothing) and cached on board.analysis.
+Rows follow board.topology.node_names, resource columns follow constants.RESOURCES.
+'''
+
+DICE_WAYS = {}
+for d1 in range(1, 7):
+    for d2 in range(1, 7):
+        DICE_WAYS[d1 + d2] = DICE_WAYS.get(d1 + d2, 0) + 1
+ROLLS = sorted(DICE_WAYS)
+WAYS = np.array([DICE_WAYS[roll] for roll in ROLLS], dtype=np.int64)
+ROLL_INDEX = {roll: k for k, roll in enumerate(ROLLS)}
+RESOURCE_INDEX = {res: k for k, res in enumerate(constants.RESOURCES)}
+
+
+def moments(counts):
+    '''counts (..., rolls, resources) -> (mean36, var1296), both (..., resources) ints.'''
+    mean36 = np.einsum('r,...rk->...k', WAYS, counts)
+    square36 = np.einsum('r,...rk->...k', WAYS, counts * counts)
+    return mean36, 36 * square36 - mean36 * mean36
+
+
+class ProductionTable:
+    def __init__(self, board, robber_hex=None):
+        topo = board.topology
+        self.robber_hex = robber_hex
+        self.index = topo.node_index
+        self.counts = np.zeros((topo.num_nodes, len(ROLLS), len(constants.RESOURCES)), dtype=np.int64)
+        for i, node_id in enumerate(topo.node_names):
+            for h in board.nodes[node_id].adj_hexes:
+                hex = board.hexes[h]
+                if h == robber_hex or hex.dice_number is None:
+                    continue
+                self.counts[i, ROLL_INDEX[hex.dice_number], RESOURCE_INDEX[hex.resource]] += 1
+        self.mean36, self.var1296 = moments(self.counts)
+        self._pair_moments = None
+
+    def node(self, node_id):
+        '''(mean36, var1296) per resource for one settlement.'''
+        i = self.index[node_id]
+        return self.mean36[i], self.var1296[i]
+
+    def group(self, node_ids, multipliers=None):
+        '''
+        (mean36, var1296) per resource for several buildings together, e.g. a player's
+        settlements and cities (multiplier 2 for a city).
+        '''
+        rows = [self.index[node_id] for node_id in node_ids]
+        if multipliers is None:
+            counts = self.counts[rows].sum(axis=0)
+        else:
+            counts = np.einsum('n,nrk->rk', np.asarray(multipliers, dtype=np.int64), self.counts[rows])
+        return moments(counts)
+
+    def pair(self, node1_id, node2_id):
+        return self.group((node1_id, node2_id))
+
+    def pairs(self):
+        '''(mean36, var1296) for every pair of settlements, shapes (nodes, nodes, resources).'''
+        if self._pair_moments is None:
+            self._pair_moments = moments(self.counts[:, None] + self.counts[None, :])
+        return self._pair_moments
+
+    def player(self, board, player):
+        buildings = list(player.settlements | player.cities)
+        multipliers = [2 if node_id in player.cities else 1 for node_id in buildings]
+        return self.group(buildings, multipliers)
+
+
+def production_table(board, robber_hex=None):
+    '''Cached ProductionTable; robber_hex=None is the board with no hex blocked, pass board.robber_hex for the live one.'''
+    tables = board.analysis.production
+    table = tables.get(robber_hex)
+    if table is None:
+        table = tables[robber_hex] = ProductionTable(board, robber_hex)
+    return table
@@ -0,0 +1,176 @@
+import math
+import pickle
+import random
+import time
+
+'''
+Rollout placement mode: instead of trusting the heuristic total, the heuristic's top few pairs
+are played out with short games and the pair with the best average result is taken.
+
+Budget goes out by successive halving: every round the surviving pairs get the same number of
+rollouts on the same seeds (so they are compared on the same dice), and the worse half is dropped,
+which spends most of the games on the pairs that are close at the top.
+A rollout finishes the draft from the current board (other seats are random placers, as in the
+backtest, our second settlement is the pair's other node if still open), plays up to max_turns
+and scores our points / 10. Games run in a multiprocessing pool when workers > 1.
+'''
+
+
+def game_from_board(board, num_players=4):
+    #Game whose players own what is already built on the board (mid-draft state)
+    from game import Game
+
+    game = Game(board, num_players)
+    for node_id, node in board.nodes.items():
+        if node.owner is None:
+            continue
+        player = game.players[node.owner]
+        player.add_port(node.port)
+        if node.building_type == 'city':
+            player.cities.add(node_id)
+            player.points += 2
+        else:
+            player.settlements.add(node_id)
+            player.points += 1
+    for edge in board.edges:
+        if edge.owner is not None:
+            game.players[edge.owner].roads.add(tuple(sorted((edge.node1.id, edge.node2.id))))
+    for player in game.players:
+        player.network.rebuild(player.settlements, player.cities, player.roads)
+    return game
+
+
+def finish_draft(game, bots, seat, taken_nodes, first, second):
+    #run_draft from `seat`'s first pick on: seats before it have already placed
+    board = game.board
+    taken = set(taken_nodes)
+    firsts = {}
+
+    def take(node_id):
+        taken.add(node_id)
+        taken.update(board.nodes[node_id].connected_nodes)
+
+    for bot in bots[seat:]:
+        node = first if bot.player_id == seat else game.pick_random_settle(taken)
+        take(node)
+        firsts[bot.player_id] = node
+        road = bot.choose_road_after_settlement(board, node, bot.player_id)
+        game.place_initial_settle_and_road(game.players[bot.player_id], node, road)
+
+    seconds = []
+    for bot in reversed(bots):
+        if bot.player_id != seat:
+            node2 = game.pick_random_settle(taken)
+        elif second not in taken:
+            node2 = second
+        else:
+            node2 = bot.choose_second_placement(board, firsts.get(seat, first), taken)
+        take(node2)
+        seconds.append((bot.player_id, node2))
+
+    for player_id, node2 in seconds:
+        player = game.players[player_id]
+        road2 = bots[player_id].choose_road_after_settlement(board, node2, player_id)
+        success, _ = game.place_initial_settle_and_road(player, node2, road2)
+        if not success:
+            for nb in board.nodes[node2].connected_nodes:
+                ok, _ = game.place_initial_settle_and_road(player, node2, nb)
+                if ok:
+                    break
+        game.distribute_starting_resources(player)
+
+
+def rollout(task):
+    '''One game from a first-placement decision; returns seat's points / 10.'''
+    import bot as bot_module
+    from main import play_game
+
+    board_state, seat, taken_nodes, first, second, seed, max_turns, weights = task
+    bot_module.SCORING_WEIGHTS.update(weights)
+    random.seed(seed)
+    board = pickle.loads(board_state)
+    game = game_from_board(board)
+    bots = [bot_module.Bot(player_id = i, total_players = len(game.players)) for i in range(len(game.players))]
+    for player, bot in zip(game.players, bots):
+        player.bot = bot
+
+    finish_draft(game, bots, seat, taken_nodes, first, second)
+    play_game(game, max_turns)
+    return min(game.players[seat].points, 10) / 10
+
+
+class RolloutPlacer:
+    '''
+    candidates: how many of the heuristic's top pairs to play out, rollouts: total games per
+    decision, max_seconds: optional wall clock cap (checked between halving rounds),
+    workers: processes to play games in (1 = in this process).
+    '''
+    def __init__(self, candidates=8, rollouts=64, max_seconds=None, max_turns=60, workers=1, seed=0):
+        self.candidates = candidates
+        self.rollouts = rollouts
+        self.max_seconds = max_seconds
+        self.max_turns = max_turns
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.games_played = 0
+
+    def run(self, tasks):
+        if self.workers > 1:
+            if self.pool is None:
+                import multiprocessing
+                self.pool = multiprocessing.Pool(self.workers)
+            return self.pool.map(rollout, tasks)
+        #rollouts reseed the global random, keep the caller's stream where it was
+        state = random.getstate()
+        try:
+            return [rollout(task) for task in tasks]
+        finally:
+            random.setstate(state)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def choose(self, board, seat, taken_nodes, pairs):
+        '''
+        pairs: (first, second) node ids in heuristic order, best first. Returns the index of
+        the pair with the best mean rollout result (earlier pairs win ties).
+        '''
+        from bot import SCORING_WEIGHTS
+
+        if len(pairs) == 1:
+            return 0
+        start = time.perf_counter()
+        state = pickle.dumps(board)
+        taken = frozenset(taken_nodes)
+        weights = dict(SCORING_WEIGHTS)
+        totals = [0.0] * len(pairs)
+        counts = [0] * len(pairs)
+        alive = list(range(len(pairs)))
+        rounds = math.ceil(math.log2(len(pairs)))
+        spent = 0
+
+        def mean(i):
+            return totals[i] / counts[i] if counts[i] else 0.0
+
+        for r in range(rounds):
+            per_pair = max(1, (self.rollouts - spent) // (len(alive) * (rounds - r)))
+            seeds = [self.rng.getrandbits(32) for _ in range(per_pair)]
+            tasks = [(state, seat, taken, *pairs[i], seed, self.max_turns, weights) for i in alive for seed in seeds]
+            for k, reward in enumerate(self.run(tasks)):
+                i = alive[k // per_pair]
+                totals[i] += reward
+                counts[i] += 1
+            spent += len(tasks)
+
+            alive.sort(key=lambda i: (-mean(i), i))
+            if r < rounds - 1:
+                alive = sorted(alive[:math.ceil(len(alive) / 2)])
+            if self.max_seconds is not None and time.perf_counter() - start > self.max_seconds:
+                break
+
+        self.games_played += spent
+        return min(alive, key=lambda i: (-mean(i), i))
@@ -0,0 +1,112 @@
+import constants
+
+'''
+Strategy classification for a pair of settlement spots.
+A PairProfile is everything the classifiers look at, built once per pair (BoardAnalysis.pair_profile);
+the classifiers are plain functions of it, so nothing here touches the board or a Bot.
+pair_scoring does the same classification over all pairs at once with arrays, keep the two in step.
+'''
+
+STRATEGIES = ['OWS', 'OWS_HYBRID', 'ROAD', 'CITIES&ROADS', 'BALANCED', 'PORT', 'PRODUCTION']
+
+
+class PairProfile:
+    __slots__ = ('pips', 'resources', 'ports', 'numbers', 'pip_sum')
+
+    def __init__(self, pips, ports, numbers, pip_sum):
+        self.pips = pips #resource -> pips over both nodes' hexes (shared hexes once), no desert
+        self.resources = frozenset(pips)
+        self.ports = ports #every port touching either node's hexes
+        self.numbers = numbers #dice numbers around either node
+        self.pip_sum = pip_sum #node pips added up per node (a shared hex counts twice)
+
+    def pip(self, resource):
+        return self.pips.get(resource, 0)
+
+    def port_resources(self):
+        return [port.split('_')[1] for port in self.ports if '_' in port]
+
+
+def has_port_synergy(profile):
+    return any(profile.pip(res) >= 4 for res in profile.port_resources())
+
+
+def is_ows_setup(profile):
+    return profile.resources <= {'ore', 'wheat', 'sheep'}
+
+
+def ows_pip_balance_score(profile, magnifier):
+    # Ideal ratio is 4:4:2 or 6:6:3 (ore:wheat:sheep)
+    target = [6, 6, 3]
+    actual = [profile.pip('ore'), profile.pip('wheat'), profile.pip('sheep')]
+
+    # Normalize and compute closeness score (lower is better)
+    def normalize(vec):
+        total = sum(vec)
+        return [x / total if total else 0 for x in vec]
+
+    # Score inversely to distance
+    distance = sum(abs(a - b) for a, b in zip(normalize(actual), normalize(target)))
+    return max(0, 1.5 - distance * magnifier)
+
+
+def is_ows_hybrid_setup(profile):
+    # Must have decent ore and wheat, plus one non-OWS resource
+    if profile.pip('ore') >= 3 and profile.pip('wheat') >= 3:
+        return bool(profile.resources - {'ore', 'wheat', 'sheep'})
+    return False
+
+
+def is_road_setup(profile):
+    wood, brick = profile.pip('wood'), profile.pip('brick')
+    # Must have at least 3 pip production in both wood and brick, no ore, some sheep and wheat
+    if wood < 3 or brick < 3:
+        return False
+    if profile.pip('ore') > 0:
+        return False
+    if profile.pip('sheep') == 0 or profile.pip('wheat') == 0:
+        return False
+    # Check pip ratio closeness (wood/brick ~= 1:1)
+    return 0.66 <= wood / brick <= 1.5
+
+
+def is_city_and_roads_setup(profile):
+    # Must have only ore, wheat, wood, and brick (disqualify if sheep is present)
+    return profile.resources <= {'ore', 'wheat', 'wood', 'brick'}
+
+
+def city_and_roads_balance_score(profile, magnifier):
+    cities = profile.pip('ore') + profile.pip('wheat')
+    roads = profile.pip('wood') + profile.pip('brick')
+    if cities == 0 or roads == 0:
+        return 0
+    # Closer to 1 is better
+    distance = abs(cities / roads - 1)
+    return max(0, 1.5 - distance * magnifier)
+
+
+def is_balanced_setup(profile):
+    # All 5 resources with wheat support
+    return len(profile.resources) == len(constants.RESOURCES) and profile.pip('wheat') >= 3
+
+
+def is_port_setup(profile):
+    return any(profile.pip(res) >= 9 for res in profile.port_resources())
+
+
+#checked in order, first match wins
+CLASSIFIERS = [
+    ('OWS', is_ows_setup),
+    ('OWS_HYBRID', is_ows_hybrid_setup),
+    ('ROAD', is_road_setup),
+    ('CITIES&ROADS', is_city_and_roads_setup),
+    ('BALANCED', is_balanced_setup),
+    ('PORT', is_port_setup),
+]
+
+
+def classify(profile):
+    for strategy, check in CLASSIFIERS:
+        if check(profile):
+            return strategy
+    return 'PRODUCTION'
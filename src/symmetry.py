@@ -0,0 +1,102 @@
+import constants
+from topology import TOPOLOGY
+
+'''
+The 19 hex layout has 12 symmetries (6 rotations, each optionally mirrored).
+Hexes are placed on axial coordinates (q, r), rows top to bottom; a node is the
+corner shared by up to three hexes, keyed by 3 * hex centre + the two neighbour
+directions it sits between, which keeps everything in integers.
+'''
+
+#axial neighbour directions, pointy-top hexes
+EAST, SOUTH_EAST, SOUTH_WEST, WEST, NORTH_WEST, NORTH_EAST = (1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1)
+
+#HEX_TO_NODE_MAP lists each ring as: upper-left, top, upper-right, lower-right, bottom, lower-left
+RING_CORNERS = [
+    (WEST, NORTH_WEST), (NORTH_WEST, NORTH_EAST), (NORTH_EAST, EAST),
+    (EAST, SOUTH_EAST), (SOUTH_EAST, SOUTH_WEST), (SOUTH_WEST, WEST)
+]
+
+
+def hex_coordinates():
+    coords = []
+    for r in range(-2, 3):
+        for q in range(max(-2, -2 - r), min(2, 2 - r) + 1):
+            coords.append((q, r))
+    return coords
+
+
+def node_coordinates(hex_coords):
+    coords = {}
+    for h, ring in enumerate(TOPOLOGY.hex_nodes):
+        q, r = hex_coords[h]
+        for node, (d1, d2) in zip(ring, RING_CORNERS):
+            key = (3 * q + d1[0] + d2[0], 3 * r + d1[1] + d2[1])
+            if coords.setdefault(node, key) != key:
+                raise ValueError(f'HEX_TO_NODE_MAP is not a consistent hex grid at node {node}')
+    return [coords[i] for i in range(TOPOLOGY.num_nodes)]
+
+
+def transform(coord, rotations, mirror):
+    #cube coordinates (x, y, z) with x = q, z = r
+    x, z = coord
+    y = -x - z
+    if mirror:
+        y, z = z, y
+    for _ in range(rotations):
+        x, y, z = -z, -x, -y
+    return (x, z)
+
+
+def build_symmetries():
+    '''List of (hex_perm, node_perm): hex h goes to hex_perm[h], node i goes to node_perm[i].'''
+    hex_coords = hex_coordinates()
+    node_coords = node_coordinates(hex_coords)
+    hex_lookup = {c: h for h, c in enumerate(hex_coords)}
+    node_lookup = {c: i for i, c in enumerate(node_coords)}
+
+    symmetries = []
+    for mirror in (False, True):
+        for rotations in range(6):
+            hex_perm = tuple(hex_lookup[transform(c, rotations, mirror)] for c in hex_coords)
+            node_perm = tuple(node_lookup[transform(c, rotations, mirror)] for c in node_coords)
+            symmetries.append((hex_perm, node_perm))
+    return symmetries
+
+
+SYMMETRIES = build_symmetries()
+
+
+def board_codes(board):
+    '''One byte per hex (tile id * 16 + dice) and one per node (port id + 1, 0 = no port).'''
+    hex_codes = [constants.TILE_TYPES.index(hex.resource) * 16 + (hex.dice_number or 0) for hex in board.hexes]
+    port_codes = [0 if node.port is None else constants.PORT_KINDS.index(node.port) + 1 for node in board.nodes.values()]
+    return hex_codes, port_codes
+
+
+def canonical_board(board):
+    '''
+    Maps a board (hexes, dice, ports) to the smallest of its 12 symmetric images.
+    Returns (key, node_perm): key is bytes, node_perm[i] is the canonical id of node i.
+    Port positions are part of the key, so boards only collide when the ports line up too.
+    '''
+    hex_codes, port_codes = board_codes(board)
+    best_key, best_perm = None, None
+    for hex_perm, node_perm in SYMMETRIES:
+        hexes = [0] * len(hex_codes)
+        for h, code in enumerate(hex_codes):
+            hexes[hex_perm[h]] = code
+        ports = [0] * len(port_codes)
+        for i, code in enumerate(port_codes):
+            ports[node_perm[i]] = code
+        key = bytes(hexes + ports)
+        if best_key is None or key < best_key:
+            best_key, best_perm = key, node_perm
+    return best_key, best_perm
+
+
+def invert(perm):
+    inverse = [0] * len(perm)
+    for i, j in enumerate(perm):
+        inverse[j] = i
+    return tuple(inverse)
@@ -0,0 +1,111 @@
+from constants import HEX_TO_NODE_MAP, PORT_LOCATION
+
+
+class BoardTopology:
+    '''
+    Static geometry of the 19 hex board, built once and shared by every Board.
+    Nodes and edges get integer ids (node id = the number in 'node_x'), everything
+    else is stored as tuples indexed by those ids.
+    '''
+    def __init__(self, hex_to_node_map, port_location):
+        node_names = set()
+        for node_list in hex_to_node_map.values():
+            node_names.update(node_list)
+
+        self.node_names = tuple(sorted(node_names, key=lambda name: int(name.split('_')[1])))
+        self.node_index = {name: i for i, name in enumerate(self.node_names)}
+        self.num_nodes = len(self.node_names)
+        self.num_hexes = len(hex_to_node_map)
+
+        #hex -> nodes, in the ring order of HEX_TO_NODE_MAP
+        self.hex_node_names = tuple(tuple(hex_to_node_map[h]) for h in range(self.num_hexes))
+        self.hex_nodes = tuple(
+            tuple(self.node_index[name] for name in names) for names in self.hex_node_names
+        )
+
+        #node -> hexes, ascending hex index
+        node_hexes = [[] for _ in range(self.num_nodes)]
+        for h, ring in enumerate(self.hex_nodes):
+            for i in ring:
+                node_hexes[i].append(h)
+        self.node_hexes = tuple(tuple(hexes) for hexes in node_hexes)
+
+        #edges are the sides of every hex ring, stored as (low id, high id)
+        edge_pairs = set()
+        for ring in self.hex_nodes:
+            for k in range(6):
+                a, b = ring[k], ring[(k + 1) % 6]
+                edge_pairs.add((min(a, b), max(a, b)))
+        self.edge_ends = tuple(sorted(edge_pairs))
+        self.num_edges = len(self.edge_ends)
+        self.edge_a = tuple(a for a, _ in self.edge_ends)
+        self.edge_b = tuple(b for _, b in self.edge_ends)
+
+        neighbors = [set() for _ in range(self.num_nodes)]
+        node_edges = [[] for _ in range(self.num_nodes)]
+        for e, (a, b) in enumerate(self.edge_ends):
+            neighbors[a].add(b)
+            neighbors[b].add(a)
+            node_edges[a].append(e)
+            node_edges[b].append(e)
+        self.node_neighbors = tuple(tuple(sorted(n)) for n in neighbors)
+        self.node_neighbor_names = tuple(
+            tuple(self.node_names[j] for j in n) for n in self.node_neighbors
+        )
+        self.node_edges = tuple(tuple(e) for e in node_edges)
+        self.node_edge_masks = tuple(sum(1 << e for e in edges) for edges in self.node_edges) #bit e = edge e
+
+        #node pair (either order, int ids or 'node_x' names) -> edge id
+        self.edge_index = {}
+        self.edge_index_by_name = {}
+        for e, (a, b) in enumerate(self.edge_ends):
+            name_a, name_b = self.node_names[a], self.node_names[b]
+            self.edge_index[(a, b)] = self.edge_index[(b, a)] = e
+            self.edge_index_by_name[(name_a, name_b)] = self.edge_index_by_name[(name_b, name_a)] = e
+
+        #bitboards: bit i is node i. closed_masks[i] = node i plus its neighbors (the distance rule)
+        self.all_nodes_mask = (1 << self.num_nodes) - 1
+        self.node_bits = tuple(1 << i for i in range(self.num_nodes))
+        self.closed_masks = tuple(
+            self.node_bits[i] | sum(self.node_bits[j] for j in self.node_neighbors[i])
+            for i in range(self.num_nodes)
+        )
+        self.ball_masks = [self.node_bits, self.closed_masks] #grown on demand by ball_mask()
+
+        #port slots: pairs of nodes that share a harbour
+        self.port_slots = tuple(
+            (self.node_index[port_location[i]], self.node_index[port_location[i + 1]])
+            for i in range(0, len(port_location), 2)
+        )
+
+    def ball_mask(self, i, radius):
+        '''Mask of every node within `radius` steps of node i.'''
+        if radius < 0:
+            return 0
+        while len(self.ball_masks) <= radius:
+            inner = self.ball_masks[-1]
+            self.ball_masks.append(tuple(
+                self.mask_union(self.closed_masks, self.mask_to_ids(inner[n])) for n in range(self.num_nodes)
+            ))
+        return self.ball_masks[radius][i]
+
+    def mask_to_ids(self, mask):
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(low.bit_length() - 1)
+            mask ^= low
+        return ids
+
+    @staticmethod
+    def mask_union(masks, ids):
+        out = 0
+        for i in ids:
+            out |= masks[i]
+        return out
+
+    def __repr__(self):
+        return f'BoardTopology({self.num_hexes} hexes, {self.num_nodes} nodes, {self.num_edges} edges)'
+
+
+TOPOLOGY = BoardTopology(HEX_TO_NODE_MAP, PORT_LOCATION)